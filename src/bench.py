@@ -0,0 +1,143 @@
+# Offline benchmark for the recognition pipeline. Runs headless, without a webcam or a browser
+#   python src/bench.py --video clip.mp4         replays a video file through the model
+#   python src/bench.py --results session.jsonl  replays results recorded with RECORD_RESULTS_PATH in main.py
+import main as config
+from mediapipelib.gesture_recognize import *
+from mediapipelib.gesture_pool import *
+from mediapipelib.gesture_match import *
+from mediapipelib.hand_motion import *
+from mediapipelib.gesture_smoothing import *
+from mediapipelib.hand_identity import *
+from mediapipelib.hand_region import *
+from webdriverlib.yt_browser import driver_actions, driver_batch, driver_prepare
+from webdriverlib.stub_browser import *
+from webdriverlib.action_queue import *
+from pipelinelib.gesture_handler import *
+from pipelinelib.replay import *
+from pipelinelib.metrics import *
+from videolib.frame_buffers import *
+from collections import Counter
+from time import perf_counter, sleep
+import argparse
+import cv2
+
+
+class Bench(object):
+    """Builds the same handler, tracker, matcher and executor main.py does, with a StubYTDriver in place of the browser."""
+
+    def __init__(self, action_ms: int, action_delay_ms: int):
+        self.metrics = PipelineMetrics()
+        self.driver = StubYTDriver(action_ms, action_delay_ms)
+        self.executor = ActionExecutor(
+            driver_actions(lambda: self.driver),
+            config.ACTION_DEBOUNCE_MS,
+            on_complete = self.metrics.action_complete,
+            batch = driver_batch(lambda: self.driver) if config.BATCH_ACTIONS else None,
+            batch_actions = StubYTDriver.BATCH_ACTIONS,
+            prepare = driver_prepare(lambda: self.driver) if config.SPECULATE_MIN_SCORE is not None and not config.BATCH_ACTIONS else None
+        ).start()
+        self.handler = GestureHandler(
+            GestureTracker(config.MIN_GESTURE_MS, config.GESTURE_HISTORY_LEN, config.GESTURE_HISTORY_AGE_MS),
+            GestureMatcher(config.gestures),
+            self.executor,
+            info_msgs = False,
+            metrics = self.metrics,
+            poses = config.poses,
+            motion = MotionMatcher(config.gestures),
+            smoother = GestureSmoother(config.SMOOTHING_TAU_MS) if config.SMOOTHING_TAU_MS is not None else None,
+            hands = HandIdentityTracker() if config.TRACK_HAND_IDS else None,
+            speculate = config.SPECULATE_MIN_SCORE
+        )
+        self.frames = 0
+
+    def callback(self, result, output_image, timestamp_ms: int):
+        entered = perf_counter()
+        self.handler(result, output_image, timestamp_ms)
+        self.metrics.record("callback", (perf_counter() - entered) * 1000)
+        self.frames += 1
+
+    def run_video(self, path: str, model_path: str, realtime: bool, workers: int = 0) -> dict:
+        cap = cv2.VideoCapture(path)
+        frame_interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or 30)
+        rgb_pool = BufferPool(1)
+        region_tracker = HandRegionTracker() if config.TRACK_HAND_REGION else None
+        if workers > 0:
+            recognizer = GesturePoolWrapper(model_path, self.callback, workers = workers, output_images = False, target_fps = config.TARGET_FPS, metrics = self.metrics, region_tracker = region_tracker, num_hands = config.NUM_HANDS)
+        else:
+            recognizer = GestureModelWrapper(model_path, self.callback, submit_policy = config.SUBMIT_POLICY, max_in_flight = config.MAX_IN_FLIGHT, target_fps = config.TARGET_FPS, metrics = self.metrics, region_tracker = region_tracker, num_hands = config.NUM_HANDS)
+        try:
+            next_frame = perf_counter()
+            frame = None
+            while True:
+                start = perf_counter()
+                ok, frame = cap.read(frame)
+                if not ok:
+                    break
+                recognizer.process_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst = rgb_pool.next(frame.shape)), start)
+                if realtime:
+                    next_frame += frame_interval
+                    sleep(max(0, next_frame - perf_counter()))
+            while recognizer.frame_state == GestureModelWrapper.PROCESSING and perf_counter() - start < 2:
+                sleep(0.01) # let the last results come back
+        finally:
+            cap.release()
+            recognizer.close()
+        return recognizer.stats()
+
+    def run_results(self, path: str, realtime: bool) -> dict:
+        first_ms = None
+        started = perf_counter()
+        for result, timestamp_ms in load_results(path):
+            if realtime:
+                first_ms = timestamp_ms if first_ms is None else first_ms
+                sleep(max(0, started + (timestamp_ms - first_ms) / 1000 - perf_counter()))
+            self.callback(result, None, timestamp_ms)
+        return {}
+
+    def finish(self, timeout: float = 10):
+        deadline = perf_counter() + timeout
+        while self.executor.is_busy() and perf_counter() < deadline:
+            sleep(0.01)
+        self.executor.close(timeout = 1)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Offline benchmark for the recognition pipeline")
+    source = parser.add_mutually_exclusive_group(required = True)
+    source.add_argument("--video", help = "video file to use in place of CAMERA_INPUT")
+    source.add_argument("--results", help = "recognizer results recorded with RECORD_RESULTS_PATH")
+    parser.add_argument("--model", default = config.MODEL_PATH, help = "model.task file, only used with --video")
+    parser.add_argument("--workers", type = int, default = config.INFERENCE_WORKERS, help = "run the model in this many worker processes, only used with --video")
+    parser.add_argument("--realtime", action = "store_true", help = "pace input at the recorded rate instead of as fast as possible")
+    parser.add_argument("--action-ms", type = int, default = 0, help = "simulated time per browser action")
+    parser.add_argument("--action-delay-ms", type = int, default = 0, help = "simulated delay after each browser action")
+    parser.add_argument("--output", help = "also append the report to this file")
+    args = parser.parse_args()
+
+    bench = Bench(args.action_ms, args.action_delay_ms)
+    start = perf_counter()
+    if args.video is not None:
+        model_stats = bench.run_video(args.video, args.model, args.realtime, args.workers)
+    else:
+        model_stats = bench.run_results(args.results, args.realtime)
+    elapsed = perf_counter() - start
+    bench.finish()
+
+    lines = [
+        "[bench] source: %s" % (args.video or args.results),
+        "[bench] %d frames in %.2fs (%.1f fps)" % (bench.frames, elapsed, bench.frames / elapsed if elapsed > 0 else 0)
+    ]
+    if model_stats:
+        lines.append("[bench] recognizer: %s" % str(model_stats))
+    for stage, histogram in bench.metrics.stages.items():
+        lines.append("[bench] %-18s %s" % (stage, histogram.summary()))
+    lines.append("[bench] actions: %s" % str(dict(Counter(name for name, _ in bench.driver.calls))))
+    if config.SPECULATE_MIN_SCORE is not None:
+        lines.append("[bench] executor: %s" % str(bench.executor.stats()))
+    report = "\n".join(lines)
+    print(report)
+    if args.output is not None:
+        with open(args.output, "a") as f:
+            f.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -4,36 +4,83 @@ os.environ["GLOG_minloglevel"] = "3"
 os.environ["GRPC_VERBOSITY"] = "ERROR"
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
 
-from mediapipe import Image, ImageFormat
 from mediapipelib.gesture_recognize import *
+from mediapipelib.gesture_pool import *
+from mediapipelib.gesture_match import *
+from mediapipelib.landmark_features import *
+from mediapipelib.hand_motion import *
+from mediapipelib.gesture_smoothing import *
+from mediapipelib.hand_identity import *
+from mediapipelib.hand_region import *
 from webdriverlib.yt_browser import *
 from videolib.opencv_draw import *
-import traceback
+from videolib.frame_capture import *
+from videolib.frame_buffers import *
+from videolib.motion_gate import *
+from videolib.frame_governor import *
+from webdriverlib.action_queue import *
+from pipelinelib.startup import *
+from pipelinelib.gesture_handler import *
+from pipelinelib.replay import *
+from pipelinelib.metrics import *
+from pipelinelib.session import *
+import sys
 import cv2
-import asyncio
 
 
 MODEL_PATH = "./src/models/gesture_recognizer.task"
 
 INFO_MSGS = True # testing
 SHOW_CAM = True
-MIN_GESTURE_MS = 750
+MIN_GESTURE_MS = 300 # shortest a gesture can be held and still count. was 750 before smoothing- without it, one bad frame splits a held gesture
+NUM_HANDS = 2 # most hands the model looks for. more than two only makes sense with TRACK_HAND_IDS
+TRACK_HAND_IDS = True # follow each hand across frames and give it its own gesture history, instead of going by its left/right label
+SMOOTHING_TAU_MS = 60 # average each hand's gesture scores over roughly this long, with hysteresis, before tracking. None to track the raw top gesture
 GESTURE_HISTORY_AGE_MS = 5500
 GESTURE_HISTORY_LEN = 2
 CAMERA_INPUT = 0
+CAMERA_INPUTS = None # several cameras, e.g. [0, 1, 2, 3]- each one gets its own session and browser. None to use CAMERA_INPUT only
+INFERENCE_BUDGET_MS = None # ms of inference per second shared between camera sessions, None for one second per core minus one
+FRAME_BUFFER_SIZE = 2 # frames held by the capture thread- older frames get dropped when full
+FRAME_TIMEOUT_S = 1
+SUBMIT_POLICY = GestureModelWrapper.LATEST_ONLY # skip frames while the model is still busy
+MAX_IN_FLIGHT = 2 # only used with GestureModelWrapper.MAX_IN_FLIGHT
+TARGET_FPS = 30 # only used with GestureModelWrapper.TARGET_FPS
+ACTION_DEBOUNCE_MS = 300 # ignore repeats of the same action inside this window
+SPECULATE_MIN_SCORE = None # e.g. 0.7- arm a binding while its gesture is still held, if the hands' scores are at least this, so it runs the moment the hold time is up. None to wait for the frame that completes it
+BROWSER_BACKEND = "webdriver" # "webdriver" for msedgedriver, or "cdp" to drive Edge over one DevTools websocket (needs websocket-client)
+BROWSER_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".doomscroll", "profiles") # reused between runs so sign-ins stick, None for a fresh profile every time
+CDP_PORT = 9222 # remote debugging port for the "cdp" backend- a browser already listening here gets reused instead of launching a new one
+LIVENESS_INTERVAL_S = 1 # how often a background thread asks the browser if it is still there- the main loop only reads the answer
+PREFETCH_SHORTS = 2 # upcoming shorts to keep rendered and loading, so "next" has video right away. 0 to disable
+BATCH_ACTIONS = True # run each gesture's browser actions (and anything queued with them) as a single script instead of several WebDriver calls
+RECORD_RESULTS_PATH = None # write every recognizer result to this file, for replaying with bench.py. %s is replaced with the session name
+METRICS_LOG_INTERVAL_S = 30 # print per-stage latencies this often, None to disable
+TRACK_HAND_REGION = True # feed the model a downscaled crop around the hands instead of the full frame
+MOTION_GATE = True # only run the model when something moves or hands are in view
+MOTION_THRESHOLD = 25 # grayscale difference for a pixel to count as changed
+MOTION_MIN_CHANGED = 0.01 # fraction of changed pixels that counts as motion
+MOTION_KEEPALIVE_MS = 1000 # run the model at least this often, even when nothing moves
+LATENCY_BUDGET_MS = 60 # adjust capture resolution / fps to keep inference round trips under this, None to keep driver defaults
+PREVIEW_BUFFERS = 3 # annotated preview frames in rotation- the callback draws into one while the main loop shows another
+INFERENCE_WORKERS = 0 # run the model in this many worker processes instead of in-process, 0 to disable
+METRICS_PORT = None # serve per-stage latencies for Prometheus on http://127.0.0.1:<port>/metrics (first session only), None to disable
 
-# Sets to make gesture settings easier for hands
-BOTH_HANDS = int("11", 2)
-EITHER_HAND = int("00", 2)
-RIGHT_HAND = int("01", 2)
-LEFT_HAND = int("10", 2)
+# Custom static poses, recognized from the hand landmarks. A hand that matches one is tracked as the pose instead of the model's gesture,
+# so they can be used in the gestures below like the built-in ones. Features are listed in FEATURE_NAMES (joint angles in degrees, distances in palm lengths)
+poses = PoseClassifier()
+#poses.add_rule("Pinch", thumb_index = (None, 0.3), middle_pip = (150, None), ring_pip = (150, None), pinky_pip = (150, None))
 
 # Gestures
+# a binding can also be a list- e.g. a held pose or a flick. Swipe and Flick fire on hand motion instead of a held pose
 gestures = { # deault: ["None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou"]
-    "next": GestureSequence(
-        #["None", 500, EITHER_HAND],
-        ["Open_Palm", 750, EITHER_HAND],
-    ),
+    "next": [
+        GestureSequence(
+            #["None", 500, EITHER_HAND],
+            ["Open_Palm", 750, EITHER_HAND],
+        ),
+        Flick("up")
+    ],
     "prev": GestureSequence(
         ["Pointing_Up", 600, LEFT_HAND]
     ),
@@ -52,102 +99,53 @@ gestures = { # deault: ["None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thum
 }
 
 
-if INFO_MSGS: print("[main] Initalizaing Gesture Trackers")
-gestureTracker = GestureTracker(MIN_GESTURE_MS, GESTURE_HISTORY_LEN, GESTURE_HISTORY_AGE_MS)
-if INFO_MSGS: print("[main] Initalizaing Webdriver")
-browser = YTDriver(left_monitor = True)
-
-
-# Gesture actions
-actions = {
-    "next": lambda: browser.on_target_page() and browser.next_video(),
-    "prev": lambda: browser.on_target_page() and browser.prev_video(),
-    "like": lambda: browser.on_target_page() and browser.toggle_like(),
-    "dislike": lambda: browser.on_target_page() and browser.toggle_dislike(),
-    "pause": lambda: browser.on_target_page() and browser.toggle_pause(),
-    "quit": lambda: browser.close()
-}
-
-
-def gestureCallback(result: "mediapipe.tasks.vision.GestureRecognizerResult", output_image: Image, timestamp_ms: int):
-    """Only designed for a maximum of two hands per frame. Things will get weird/unintended behaviour if there are more
-        I am not even going to attempt to add handles that
-    """
-    try: #idfk man
-        global gestures
-        handedness_list = result.handedness
-        gestures_list = result.gestures
-        
-        # determine if there are multiple hands in the frame, and that they belong to the same person (left and right, and not two of the same hand)
-        if len(handedness_list) > 1 and handedness_list[0][0].category_name != handedness_list[1][0].category_name:
-            gesture = gestures_list[0][0].category_name
-            gesture_gesture = gestures_list[1][0].category_name
-            hand = handedness_list[0][0].category_name
-            hand_hand = handedness_list[1][0].category_name
-            # are they doing the same gesture or do they need to be treated seperately>
-            if gesture == gesture_gesture:
-                gestureTracker.append(gesture, BOTH_HANDS, timestamp_ms)
-            else:
-                gestureTracker.append(
-                    gesture, 
-                    LEFT_HAND if hand_hand == "Left" else RIGHT_HAND,
-                    timestamp_ms
-                )
-                gestureTracker.append(
-                    gesture_gesture, 
-                    LEFT_HAND if hand_hand == "Left" else RIGHT_HAND,
-                    timestamp_ms
-                )
-        elif len(handedness_list) >= 1: # otherwise just grab the first single hand we indexed 
-            gestureTracker.append(
-                gestures_list[0][0].category_name,
-                LEFT_HAND if handedness_list[0][0].category_name == "Left" else RIGHT_HAND,
-                timestamp_ms
-            )
-        else: # update GestureTracker with current timestamp
-            gestureTracker.append("", BOTH_HANDS, timestamp_ms)
-        for name, gs in gestures.items():
-            if gestureTracker.sequence_view().gesture_set != set([]) and gestureTracker.sequence_view()[-1].gesture == name:
-                print(gestureTracker.sequence_view()[-1])
-                print(gs)
-                print(gs in gestureTracker.sequence_view())
-            if gs in gestureTracker.sequence_view():
-                if INFO_MSGS: print("[callback] Running action '%s'" % name)
-                gestureTracker.clear_queue()
-                actions[name]()
-                break
-        if SHOW_CAM:
-            return annotate_image(output_image, result)
-    except Exception as e:
-        print(f"[callback] Error: ", end = "")
-        print(e, end = ". ")
-        print("Trace: " + traceback.format_exc())
-        return black_image(500, 500, "Video stream error")
-
-if browser.is_running(): # did we crash at startup
-    if INFO_MSGS: print("[main] Initalizaing Gesture Recognizer")
-    recognizer = GestureModelWrapper(MODEL_PATH, gestureCallback)
-
+def main():
+    config = sys.modules[__name__]
+    cameras = [CAMERA_INPUT] if CAMERA_INPUTS is None else CAMERA_INPUTS
+    if INFO_MSGS: print("[main] Initalizaing Gesture Trackers")
+    # a single camera keeps the old "[main]" log lines, several get one session (and browser) each
+    sessions = [GestureSession("main" if len(cameras) == 1 else "camera%d" % i, camera, config, index = i) for i, camera in enumerate(cameras)]
+    scheduler = None
+    if len(sessions) > 1:
+        scheduler = SessionScheduler(INFERENCE_BUDGET_MS)
+        for session in sessions:
+            scheduler.add(session)
+    metricsExporters = []
+    for session in sessions:
+        if METRICS_LOG_INTERVAL_S is not None:
+            metricsExporters.append(MetricsLogger(session.metrics, METRICS_LOG_INTERVAL_S, None if len(sessions) == 1 else session.name).start())
+    if METRICS_PORT is not None:
+        metricsExporters.append(PrometheusExporter(sessions[0].metrics, METRICS_PORT).start())
+    startup = StartupOrchestrator(INFO_MSGS, max_workers = 3 * len(sessions))
+    for session in sessions:
+        session.start(startup)
     try:
-        if INFO_MSGS: print("[main] Opening video capture device")
-        cap = cv2.VideoCapture(CAMERA_INPUT)
+        for session in sessions:
+            session.wait()
         if INFO_MSGS: print("[main] Starting main loop")
-        while cap.isOpened():
-            _ , frame = cap.read()
-            img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            mp_img = Image(image_format=ImageFormat.SRGB, data=img)
-            recognizer.process(mp_img)
-            if SHOW_CAM and recognizer.last_callback_result is not None:# and recognizer.frame_state == 1:
-                cv2.imshow('press Q to exit', cv2.cvtColor(recognizer.last_callback_result, cv2.COLOR_RGB2BGR))
-            if cv2.waitKey(1) & 0xFF == ord('q') or not browser.is_running():
+        # with several cameras nobody waits on a single device, the waitKey below paces the loop instead
+        timeout = FRAME_TIMEOUT_S if len(sessions) == 1 else 0
+        while True:
+            live = [session for session in sessions if session.alive()]
+            if len(live) == 0:
+                break
+            for session in live:
+                session.step(scheduler, timeout)
+                session.show_preview('press Q to exit' if len(sessions) == 1 else '%s - press Q to exit' % session.name)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
     except Exception as e:
         print("[main] Something went wrong. Trace:")
         print(e)
     finally:
-        if browser.is_running(): browser.close()
-        cap.release()
+        for exporter in metricsExporters:
+            exporter.close()
+        for session in sessions:
+            session.close()
+        startup.close()
+        if INFO_MSGS: print("[main] Startup timings: %s" % startup.report())
+        if INFO_MSGS and scheduler is not None: print("[main] Scheduler stats: %s" % str(scheduler.stats()))
         cv2.destroyAllWindows()
-        recognizer.close()
-else:
-    print("[main] Webdriver crashed- something went wrong with YTWrapper initialization.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
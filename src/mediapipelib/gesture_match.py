@@ -0,0 +1,143 @@
+# Module containing the compiled matcher for GestureSequence bindings
+from mediapipelib.gesture_recognize import GestureData, GestureSequence, GestureTracker
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+def binding_items(gestures: Dict[str, Any]) -> Iterator[Tuple[int, str, Any]]:
+    """Flattens the gestures table into (priority, name, binding). A name can be bound to a single binding, or a list of them."""
+    for priority, (name, bindings) in enumerate(gestures.items()):
+        for binding in (bindings if isinstance(bindings, (list, tuple)) else [bindings]):
+            yield priority, name, binding
+
+class _MatchNode(object):
+    def __init__(self):
+        self.children: Dict[Tuple[int, int], List[Tuple[int, "_MatchNode"]]] = dict() # (gesture code, handedness) -> [(minimum duration, node)]
+        self.binding: Optional[Tuple[int, str]] = None # (priority, name) of the binding ending here
+
+class GestureMatcher(object):
+    """Matches a GestureTracker against every registered GestureSequence at once.
+    The sequences are compiled into a trie of their reversed steps, keyed on (gesture code, handedness) with the step duration as a guard.
+    Matching walks backwards from the newest tracked gestures, so the cost only depends on how long the matching sequences are, not on how many are registered.
+    predict() walks the same trie from the gesture that is still being held, to tell which binding it is on its way to.
+
+    Args:
+        gestures (Dict[str, Any]): Binding names mapped to the sequences that trigger them, or lists of them. Other bindings (e.g. motion gestures) are skipped. When several bindings match at once, the one registered first wins.
+
+    Returns:
+        GestureMatcher object.
+    """
+
+    def __init__(self, gestures: Dict[str, Any]):
+        self._root = _MatchNode()
+        self._last_end: Dict[GestureTracker, GestureData] = dict() # tracker -> its newest gesture as of the previous match() call
+        for priority, name, binding in binding_items(gestures):
+            if isinstance(binding, GestureSequence):
+                self._add(priority, name, binding)
+
+    def _add(self, priority: int, name: str, sequence: GestureSequence):
+        if len(sequence) == 0:
+            raise ValueError("Gesture binding '%s' is empty" % name)
+        node = self._root
+        for gd in reversed(sequence()):
+            edges = node.children.setdefault((gd.code, gd.handedness), [])
+            for duration, child in edges:
+                if duration == gd.duration:
+                    node = child
+                    break
+            else:
+                child = _MatchNode()
+                edges.append((gd.duration, child))
+                node = child
+        if node.binding is None:
+            node.binding = (priority, name)
+
+    @staticmethod
+    def _keys(gd: GestureData):
+        # same handedness rules as GestureData.__contains__
+        if gd.handedness != 0:
+            yield (gd.code, gd.handedness)
+        if gd.handedness == 1 or gd.handedness == 2:
+            yield (gd.code, 0)
+
+    def _walk(self, states: List[_MatchNode], entries: List[GestureData], start: int) -> List[Tuple[int, str]]:
+        """(priority, name) of every binding whose remaining steps entries[start:] satisfy, walking from states."""
+        found = []
+        for gd in entries[start:]:
+            next_states = []
+            for node in states:
+                for key in self._keys(gd):
+                    for duration, child in node.children.get(key, ()):
+                        if duration <= gd.duration:
+                            if child.binding is not None:
+                                found.append(child.binding)
+                            if len(child.children) > 0:
+                                next_states.append(child)
+            if len(next_states) == 0:
+                break
+            states = next_states
+        return found
+
+    def _match_from(self, entries: List[GestureData], start: int) -> Optional[Tuple[int, str]]:
+        found = self._walk([self._root], entries, start)
+        return min(found) if len(found) > 0 else None
+
+    def match(self, tracker: GestureTracker) -> Optional[str]:
+        """Finds the binding that the tracker currently satisfies.
+        Only windows ending at gestures that are new or still growing since the last call for the same tracker are checked- older windows were already checked back then.
+
+        Args:
+            tracker (GestureTracker): Tracker to match against, checked against its sequence_view.
+
+        Returns:
+            Optional[str]: The name of the matching binding, or None.
+        """
+        entries = list(tracker.recent())
+        last_end = self._last_end.get(tracker)
+        best = None
+        for end in range(len(entries)):
+            found = self._match_from(entries, end)
+            if found is not None and (best is None or found < best):
+                best = found
+            if entries[end] is last_end:
+                break
+        self._last_end[tracker] = entries[0] if len(entries) > 0 else None
+        return None if best is None else best[1]
+
+    def predict(self, tracker: GestureTracker) -> Optional[Tuple[str, int]]:
+        """Finds the binding the gesture being held is on its way to, i.e. every earlier step of it is already satisfied and only the held one is short.
+        Only predicts once the held gesture passed the tracker's minimum duration, and only when a single binding is possible.
+
+        Args:
+            tracker (GestureTracker): Tracker to predict for.
+
+        Returns:
+            Optional[Tuple[str, int]]: The name of the binding and how many more milliseconds the gesture has to be held for, or None.
+        """
+        current = tracker.current()
+        entries = list(tracker.recent())
+        if current is None or len(entries) == 0 or entries[0] is not current:
+            return None
+        name = None
+        remaining = None
+        for key in self._keys(current):
+            for duration, child in self._root.children.get(key, ()):
+                if duration <= current.duration:
+                    continue # already satisfied, match() deals with it
+                found = self._walk([child], entries, 1)
+                if child.binding is not None:
+                    found.append(child.binding)
+                for _, found_name in found:
+                    if name is not None and found_name != name:
+                        return None # could still become either
+                    name = found_name
+                    remaining = duration - current.duration if remaining is None else min(remaining, duration - current.duration)
+        return None if name is None else (name, remaining)
+
+    def reset(self, tracker: GestureTracker = None):
+        """Call after clearing a tracker the matcher is used with, or with no tracker after clearing all of them."""
+        if tracker is None:
+            self._last_end.clear()
+        else:
+            self._last_end.pop(tracker, None)
+
+    def __repr__(self):
+        return "<GestureMatcher>{'last_end': %s}" % str(self._last_end)
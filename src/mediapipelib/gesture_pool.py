@@ -0,0 +1,219 @@
+# Module containing the multi-process backend for GestureModelWrapper
+import mediapipe
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+from time import perf_counter
+from typing import Tuple, Union
+import numpy as np
+import cv2
+from mediapipelib.gesture_recognize import GestureModelWrapper, default_result_callback
+
+def _pool_worker(model_path: str, gpu_enabled: bool, video_mode: bool, num_hands: int, slot_names: list, jobs, results, started):
+    """Runs one GestureRecognizer in a worker process. Jobs are (slot, shape, timestamp_ms), or None to stop.
+    Every job gets exactly one (timestamp_ms, slot, result, error) back, so the parent can always free the slot.
+    started gets None once the recognizer is up, or the error if it failed to come up."""
+    slots = [shared_memory.SharedMemory(name = name) for name in slot_names]
+    try:
+        BaseOptions = mediapipe.tasks.BaseOptions
+        base_options = BaseOptions(model_asset_path=model_path, delegate = mediapipe.tasks.BaseOptions.Delegate.GPU) if gpu_enabled else BaseOptions(model_asset_path = model_path)
+        options = mediapipe.tasks.vision.GestureRecognizerOptions(
+            base_options = base_options,
+            running_mode = mediapipe.tasks.vision.RunningMode.VIDEO if video_mode else mediapipe.tasks.vision.RunningMode.IMAGE,
+            num_hands = num_hands
+        )
+        recognizer = mediapipe.tasks.vision.GestureRecognizer.create_from_options(options)
+    except Exception as e:
+        started.put(str(e))
+        for slot in slots:
+            slot.close()
+        return
+    started.put(None)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            slot, shape, timestamp_ms = job
+            try:
+                # mediapipe.Image copies the pixels, the slot is not read again after this
+                image = mediapipe.Image(image_format = mediapipe.ImageFormat.SRGB, data = np.ndarray(shape, dtype = np.uint8, buffer = slots[slot].buf))
+                result = recognizer.recognize_for_video(image, timestamp_ms) if video_mode else recognizer.recognize(image)
+                results.put((timestamp_ms, slot, result, None))
+            except Exception as e:
+                results.put((timestamp_ms, slot, None, str(e)))
+    finally:
+        recognizer.close()
+        for slot in slots:
+            slot.close()
+
+class GesturePoolWrapper(GestureModelWrapper):
+    """GestureModelWrapper backed by a pool of worker processes, each running its own GestureRecognizer.
+    Inference no longer shares the GIL with frame conversion and result handling, so several cores can be used for high frame rates or multiple cameras.
+    Frames are passed through shared memory slots, and results are put back in timestamp order before result_callback sees them,
+    so the callback contract is the same as GestureModelWrapper's. process() and process_frame() should be called from one thread.
+
+    Args:
+        model_path (str): Filepath to the model.task file.
+        result_callback (Callable[[GestureRecognizerResult, mediapipe.Image, int], Any]): Same as GestureModelWrapper. Called from the pool's dispatch thread.
+        workers (int, optional): Number of worker processes. Defaults to 2.
+        video_mode (bool, optional): Run the workers in VIDEO mode, which tracks hands between the frames each worker sees. IMAGE mode treats every frame on its own. Defaults to True.
+        slots (int, optional): Shared memory frame slots. Frames are skipped while every slot is in use. Defaults to twice the number of workers.
+        max_frame_shape (Tuple[int, int, int], optional): Largest (height, width, channels) frame the slots can hold. Bigger frames are downscaled to fit. Defaults to (1080, 1920, 3).
+        output_images (bool, optional): Hand result_callback a copy of the frame each result came from. Defaults to True.
+        start_timeout_s (float, optional): How long the constructor waits for the workers to load the model. Defaults to 30.
+        submit_policy (int, optional): Same as GestureModelWrapper. Defaults to MAX_IN_FLIGHT.
+        max_in_flight (int, optional): Same as GestureModelWrapper. Defaults to the number of workers.
+        **kwargs: Passed on to GestureModelWrapper (gpu_enabled, target_fps, in_flight_timeout_ms, metrics, region_tracker, full_output, num_hands).
+
+    Returns:
+        GesturePoolWrapper object. Call close() to stop the workers and free the shared memory.
+    """
+
+    def __init__(self, model_path: str, result_callback = default_result_callback, workers: int = 2, video_mode: bool = True, slots: int = None, max_frame_shape: Tuple[int, int, int] = (1080, 1920, 3), output_images: bool = True, start_timeout_s: float = 30, submit_policy: int = GestureModelWrapper.MAX_IN_FLIGHT, max_in_flight: int = None, **kwargs):
+        if workers < 1:
+            raise ValueError("GesturePoolWrapper needs at least one worker")
+        self.workers = workers
+        self.video_mode = video_mode
+        self._slot_count = workers * 2 if slots is None else slots
+        self._slot_bytes = int(np.prod(max_frame_shape))
+        self._output_images = output_images
+        self._start_timeout = start_timeout_s
+        super().__init__(model_path, result_callback, submit_policy = submit_policy, max_in_flight = workers if max_in_flight is None else max_in_flight, **kwargs)
+        # the dispatcher reads the in-flight state GestureModelWrapper.__init__ sets up after _create_recognizer, so it can only start now
+        self._dispatching = True
+        self._dispatcher = threading.Thread(target = self._dispatch_loop, name = "GesturePoolDispatch", daemon = True)
+        self._dispatcher.start()
+
+    def _create_recognizer(self, model_path: str, gpu_enabled: bool):
+        # spawn everywhere, so workers behave the same on Linux as on Windows and never inherit the parent's threads
+        context = multiprocessing.get_context("spawn")
+        self._shared = [shared_memory.SharedMemory(create = True, size = self._slot_bytes) for _ in range(self._slot_count)]
+        self._free_slots = list(range(self._slot_count))
+        self._slot_shapes = dict() # slot -> shape of the frame in it
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        started = context.Queue()
+        self._order = [] # submitted timestamps, oldest first, waiting to be handed to result_callback
+        self._finished = dict() # timestamp_ms -> (result, output_image) that came back ahead of an older frame
+        self.results_reordered = 0
+        self.results_dropped = 0
+        self.worker_errors = 0
+        self.frames_downscaled = 0 # frames bigger than max_frame_shape, shrunk to fit a slot
+        self._processes = [
+            context.Process(target = _pool_worker, args = (model_path, gpu_enabled, self.video_mode, self.num_hands, [slot.name for slot in self._shared], self._jobs, self._results, started), name = "GesturePoolWorker-%d" % i, daemon = True)
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        # block and raise like GestureRecognizer.create_from_options does, so frames aren't queued up behind the model loading
+        deadline = perf_counter() + self._start_timeout
+        for _ in self._processes:
+            try:
+                error = started.get(timeout = max(0, deadline - perf_counter()))
+            except queue.Empty:
+                error = "workers took longer than %ds to start" % self._start_timeout
+            if error is not None:
+                self._stop_workers()
+                raise RuntimeError("GesturePoolWrapper failed to start. %s" % error)
+        return None
+
+    def _should_submit(self, timestamp_ms: int) -> bool:
+        return len(self._free_slots) > 0 and super()._should_submit(timestamp_ms)
+
+    def _submit(self, image: Union[mediapipe.Image, np.ndarray], timestamp_ms: int):
+        frame = image.numpy_view() if isinstance(image, mediapipe.Image) else image
+        if frame.nbytes > self._slot_bytes:
+            # the frame is already reserved, so shrink it into the slot instead of failing halfway through. landmarks come back normalized, so nothing downstream notices
+            scale = (self._slot_bytes / frame.nbytes) ** 0.5
+            frame = cv2.resize(frame, (int(frame.shape[1] * scale), int(frame.shape[0] * scale)), interpolation = cv2.INTER_AREA)
+            self.frames_downscaled += 1
+        with self._in_flight_lock:
+            slot = self._free_slots.pop()
+            self._slot_shapes[slot] = frame.shape
+            self._order.append(timestamp_ms)
+        np.copyto(np.ndarray(frame.shape, dtype = np.uint8, buffer = self._shared[slot].buf), frame)
+        self._jobs.put((slot, frame.shape, timestamp_ms))
+
+    def _dispatch_loop(self):
+        while self._dispatching:
+            try:
+                item = self._results.get(timeout = 0.1)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                if not self._collect(*item):
+                    break
+            for result, output_image, timestamp_ms in self._ready():
+                self._result_callback_wrapper(result, output_image, timestamp_ms)
+
+    def _collect(self, timestamp_ms: int, slot: int, result, error: str) -> bool:
+        """Takes one message from a worker and frees its slot. Returns False when the dispatch loop should stop."""
+        if slot is None and timestamp_ms is None and error is None:
+            return False
+        if error is not None:
+            self.worker_errors += 1
+            print("[GesturePoolWrapper] Error: %s" % error)
+        output_image = None
+        if result is not None and self._output_images:
+            output_image = mediapipe.Image(image_format = mediapipe.ImageFormat.SRGB, data = np.ndarray(self._slot_shapes[slot], dtype = np.uint8, buffer = self._shared[slot].buf))
+        with self._in_flight_lock:
+            if slot is not None:
+                self._free_slots.append(slot)
+            if timestamp_ms in self._order:
+                if timestamp_ms != self._order[0]:
+                    self.results_reordered += 1
+                self._finished[timestamp_ms] = (result, output_image)
+        return True
+
+    def _ready(self) -> list:
+        """Pops every result that can go out in timestamp order. A frame that failed, or took longer than in_flight_timeout_ms, stops holding back the ones after it."""
+        ready = []
+        now_ms = self._get_time_ms()
+        with self._in_flight_lock:
+            while len(self._order) > 0:
+                timestamp_ms = self._order[0]
+                if timestamp_ms in self._finished:
+                    result, output_image = self._finished.pop(timestamp_ms)
+                    self._order.pop(0)
+                    if result is not None:
+                        ready.append((result, output_image, timestamp_ms))
+                    continue
+                if now_ms - timestamp_ms <= self._in_flight_timeout:
+                    break
+                self._order.pop(0)
+                self.results_dropped += 1
+        return ready
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "workers": sum(1 for process in self._processes if process.is_alive()),
+            "reordered": self.results_reordered,
+            "dropped": self.results_dropped,
+            "errors": self.worker_errors,
+            "downscaled": self.frames_downscaled
+        })
+        return stats
+
+    def _stop_workers(self):
+        for _ in self._processes:
+            self._jobs.put(None)
+        deadline = perf_counter() + 2
+        for process in self._processes:
+            process.join(timeout = max(0, deadline - perf_counter()))
+            if process.is_alive():
+                process.terminate()
+        for slot in self._shared:
+            slot.close()
+            slot.unlink()
+
+    def close(self):
+        self._dispatching = False
+        self._results.put((None, None, None, None))
+        self._dispatcher.join(timeout = 1)
+        self._stop_workers()
+
+    def __repr__(self):
+        return "<GesturePoolWrapper>%s" % str(self.stats())
@@ -1,13 +1,55 @@
 # Module containing the class for Gesture recognition
 import mediapipe
+import threading
+from array import array
 from collections import deque
 from time import perf_counter
-from typing import Union, Literal, Set
+from typing import Union, Literal, Optional, Set
+import numpy as np
 
 default_result_callback = lambda r, o, t: print('gesture recognition result: {}'.format(r))
 
 HANDEDNESS_MASK = Literal[0, 1, 2, 3]
-GESTURE_SET = set(["", "None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou"])
+# Sets to make gesture settings easier for hands
+BOTH_HANDS = int("11", 2)
+EITHER_HAND = int("00", 2)
+RIGHT_HAND = int("01", 2)
+LEFT_HAND = int("10", 2)
+GESTURE_LIST = ["", "None", "Closed_Fist", "Open_Palm", "Pointing_Up", "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou"] # index is the gesture code
+GESTURE_SET = set(GESTURE_LIST)
+GESTURE_CODES = {gesture: code for code, gesture in enumerate(GESTURE_LIST)}
+
+def gesture_code(gesture: Union[str, int]) -> int:
+    """Interns a gesture name to its small integer code.
+
+    Raises:
+        ValueError: If the gesture is not recognized as part of the gesture set.
+    """
+    if isinstance(gesture, int):
+        if gesture < 0 or gesture >= len(GESTURE_LIST):
+            raise ValueError("%d is not a recognized gesture code" % gesture)
+        return gesture
+    try:
+        return GESTURE_CODES[gesture]
+    except KeyError:
+        raise ValueError("%s is not a recognized gesture" % gesture) from None
+
+def register_gesture(gesture: str) -> int:
+    """Adds a custom gesture name, e.g. a pose from a PoseClassifier, so it gets a code and can be used in GestureSequences.
+    Registering a name that already exists returns its existing code.
+
+    Raises:
+        ValueError: If every gesture code is already taken.
+    """
+    if gesture in GESTURE_CODES:
+        return GESTURE_CODES[gesture]
+    if len(GESTURE_LIST) >= 256:
+        raise ValueError("No gesture codes left for %s" % gesture) # codes are stored as unsigned bytes
+    GESTURE_LIST.append(gesture)
+    GESTURE_SET.add(gesture)
+    GESTURE_CODES[gesture] = len(GESTURE_LIST) - 1
+    return GESTURE_CODES[gesture]
+
 class GestureModelWrapper(object):
     """Wrapper class for MediaPipe's Recognizer.
 
@@ -21,6 +63,14 @@ class GestureModelWrapper(object):
             ]\
         ): Callback handler for processed images. Callback method will be called asynchronously, but does not need to be asynchronous.
         gpu_enabled (bool, optional): Delegate model recognition processing to the GPU. At time of writing, this feature is not available for Windows. Defaults to False.
+        submit_policy (int, optional): When frames get handed to the model, one of LATEST_ONLY, MAX_IN_FLIGHT or TARGET_FPS. Frames that are not submitted are skipped. Defaults to LATEST_ONLY.
+        max_in_flight (int, optional): Frames allowed inside the model at once under MAX_IN_FLIGHT. Defaults to 2.
+        target_fps (float, optional): Submission rate under TARGET_FPS. Defaults to 30.
+        in_flight_timeout_ms (int, optional): Submitted frames with no result after this long are assumed dropped by MediaPipe. Defaults to 1000.
+        metrics (PipelineMetrics, optional): Records when each frame is submitted. Defaults to None.
+        region_tracker (HandRegionTracker, optional): Crops and downscales frames passed to process_frame around the tracked hands. Result landmarks are mapped back to full-frame coordinates before reaching result_callback. Defaults to None.
+        full_output (bool, optional): With a region_tracker, hand result_callback the full frame instead of the crop, e.g. for drawing a preview. Costs an extra image copy per frame. Defaults to False.
+        num_hands (int, optional): Most hands the model looks for in a frame. Defaults to 2.
 
     Returns:
         GestureModelWrapper object containing a GestureRecognizer instance.
@@ -29,35 +79,178 @@ class GestureModelWrapper(object):
     EMPTY = -1
     PROCESSING = 0
     READY = 1
-
-    def __init__(self, model_path: str, result_callback = default_result_callback, gpu_enabled = False):
+    # submission policies
+    LATEST_ONLY = 0 # only submit when the model is idle
+    MAX_IN_FLIGHT = 1 # submit until max_in_flight frames are waiting on results
+    TARGET_FPS = 2 # submit at a fixed rate, regardless of the model
+
+    def __init__(self, model_path: str, result_callback = default_result_callback, gpu_enabled = False, submit_policy: int = LATEST_ONLY, max_in_flight: int = 2, target_fps: float = 30, in_flight_timeout_ms: int = 1000, metrics = None, region_tracker = None, full_output: bool = False, num_hands: int = 2):
+        if submit_policy not in (self.LATEST_ONLY, self.MAX_IN_FLIGHT, self.TARGET_FPS):
+            raise ValueError("%s is not a recognized submission policy" % str(submit_policy))
+        self._result_callback = result_callback
+        self.num_hands = num_hands
+        self.recognizer = self._create_recognizer(model_path, gpu_enabled)
+        self.last_gesture = "None"
+        self.frame_state = self.EMPTY
+        self.start_time = None
+        self.last_callback_result = None
+        self.submit_policy = submit_policy
+        self.max_in_flight = 1 if submit_policy == self.LATEST_ONLY else max_in_flight
+        self.target_fps = target_fps
+        self._in_flight_timeout = in_flight_timeout_ms
+        self._in_flight = deque() # timestamps of frames waiting on a result
+        self._in_flight_lock = threading.Lock()
+        self._last_submit_ms = -1
+        self.frames_submitted = 0
+        self.frames_skipped = 0
+        self.frames_completed = 0
+        self.metrics = metrics
+        self.region_tracker = region_tracker
+        self._full_output = full_output
+        self._regions = dict() # timestamp_ms -> (Region, full frame mediapipe.Image or None) for frames cropped by region_tracker
+        self.hands_present = False # whether the last result had any hands in it
+        self.round_trip_ms = None # moving average of the time from recognize_async to the result callback
+        self.max_fps = None # optional cap on the submission rate on top of submit_policy
+        self.frames_ticked = 0
+
+    def _create_recognizer(self, model_path: str, gpu_enabled: bool):
         BaseOptions = mediapipe.tasks.BaseOptions
         GestureRecognizerOptions = mediapipe.tasks.vision.GestureRecognizerOptions
         base_options = BaseOptions(model_asset_path=model_path, delegate = mediapipe.tasks.BaseOptions.Delegate.GPU) if gpu_enabled else BaseOptions(model_asset_path = model_path)
         options = GestureRecognizerOptions(
             base_options = base_options,
             running_mode = mediapipe.tasks.vision.RunningMode.LIVE_STREAM,
-            num_hands = 2,
+            num_hands = self.num_hands,
             result_callback = self._result_callback_wrapper
         )
-        self._result_callback = result_callback
-        self.recognizer = mediapipe.tasks.vision.GestureRecognizer.create_from_options(options)
-        self.last_gesture = "None"
-        self.frame_state = self.EMPTY
-        self.start_time = None
-        self.last_callback_result = None
-        
-    def _result_callback_wrapper(self, *args, **kwargs):
-        self.frame_state = self.READY
-        self.last_callback_result = self._result_callback(*args, **kwargs)
+        return mediapipe.tasks.vision.GestureRecognizer.create_from_options(options)
+
+    def _submit(self, image: Union[mediapipe.Image, np.ndarray], timestamp_ms: int):
+        """Hands an accepted frame to the model. Overridden by GesturePoolWrapper."""
+        if isinstance(image, np.ndarray):
+            image = mediapipe.Image(image_format = mediapipe.ImageFormat.SRGB, data = image)
+        self.recognizer.recognize_async(image, timestamp_ms)
+
+    def _result_callback_wrapper(self, result, output_image, timestamp_ms: int):
+        region = None
+        with self._in_flight_lock:
+            # MediaPipe never reports frames it drops, so anything older than this result isn't coming back either
+            while len(self._in_flight) > 0 and self._in_flight[0] <= timestamp_ms:
+                self._in_flight.popleft()
+            while len(self._regions) > 0:
+                ts = next(iter(self._regions))
+                if ts > timestamp_ms:
+                    break
+                entry = self._regions.pop(ts)
+                if ts == timestamp_ms:
+                    region = entry
+            self.frames_completed += 1
+            if len(self._in_flight) == 0:
+                self.frame_state = self.READY
+        self.hands_present = len(result.handedness) > 0
+        round_trip = self._get_time_ms() - timestamp_ms
+        self.round_trip_ms = round_trip if self.round_trip_ms is None else self.round_trip_ms * 0.8 + round_trip * 0.2
+        if region is not None:
+            self.region_tracker.remap(result, region[0])
+            if region[1] is not None:
+                output_image = region[1]
+        self.last_callback_result = self._result_callback(result, output_image, timestamp_ms)
+
+    def _should_submit(self, timestamp_ms: int) -> bool:
+        if timestamp_ms <= self._last_submit_ms:
+            # recognize_async needs strictly increasing timestamps
+            return False
+        while len(self._in_flight) > 0 and timestamp_ms - self._in_flight[0] > self._in_flight_timeout:
+            self._in_flight.popleft()
+        if self.max_fps is not None and self._last_submit_ms >= 0 and timestamp_ms - self._last_submit_ms < 1000 / self.max_fps:
+            return False
+        if self.submit_policy == self.TARGET_FPS:
+            return self._last_submit_ms < 0 or timestamp_ms - self._last_submit_ms >= 1000 / self.target_fps
+        return len(self._in_flight) < self.max_in_flight
+
+    def _reserve(self, captured_at: float = None) -> Optional[int]:
+        """Asks the submission policy for a slot. Returns the timestamp to submit with, or None if the frame should be skipped."""
+        timestamp_ms = self._get_time_ms()
+        with self._in_flight_lock:
+            if not self._should_submit(timestamp_ms):
+                self.frames_skipped += 1
+                return None
+            self._in_flight.append(timestamp_ms)
+            self._last_submit_ms = timestamp_ms
+            self.frames_submitted += 1
+            self.frame_state = self.PROCESSING
+        if self.metrics is not None:
+            self.metrics.frame_submitted(timestamp_ms, captured_at)
+        return timestamp_ms
+
+    def process(self, mediapipe_image: mediapipe.Image, captured_at: float = None) -> bool:
+        """Submits the image to the model, unless the submission policy says to skip it.
 
-    def process(self, mediapipe_image: mediapipe.Image):
-        """
         Args:
             mediapipe_image (mediapipe.Image): MediaPipe format Image
+            captured_at (float, optional): perf_counter time the frame was captured, for metrics. Defaults to None.
+
+        Returns:
+            bool: True if the image was submitted, False if it was skipped.
+        """
+        timestamp_ms = self._reserve(captured_at)
+        if timestamp_ms is None:
+            return False
+        self._submit(mediapipe_image, timestamp_ms)
+        return True
+
+    def process_frame(self, rgb_frame: np.ndarray, captured_at: float = None) -> bool:
+        """Same as process, but takes an RGB array. The mediapipe.Image is only built once the frame is accepted,
+        and only from the region_tracker's crop if there is one.
+
+        Args:
+            rgb_frame (numpy.ndarray): RGB frame, height x width x 3.
+            captured_at (float, optional): perf_counter time the frame was captured, for metrics. Defaults to None.
+
+        Returns:
+            bool: True if the frame was submitted, False if it was skipped.
+        """
+        timestamp_ms = self._reserve(captured_at)
+        if timestamp_ms is None:
+            return False
+        if self.region_tracker is not None:
+            crop, region = self.region_tracker.crop(rgb_frame)
+            full_image = mediapipe.Image(image_format = mediapipe.ImageFormat.SRGB, data = rgb_frame) if self._full_output else None
+            with self._in_flight_lock:
+                self._regions[timestamp_ms] = (region, full_image)
+            rgb_frame = crop
+        self._submit(rgb_frame, timestamp_ms)
+        return True
+
+    def tick(self) -> bool:
+        """Stands in for a frame that was never submitted (e.g. filtered out by a MotionGate) by handing result_callback an empty result,
+        so downstream trackers still see time pass. Does nothing while frames are in flight, their results will move time forward instead.
+
+        Returns:
+            bool: True if result_callback was called.
         """
-        self.frame_state = self.PROCESSING
-        self.recognizer.recognize_async(mediapipe_image, self._get_time_ms())
+        timestamp_ms = self._get_time_ms()
+        with self._in_flight_lock:
+            if len(self._in_flight) > 0 or timestamp_ms <= self._last_submit_ms:
+                return False
+            self.frames_ticked += 1
+        self.hands_present = False
+        self._result_callback(mediapipe.tasks.vision.GestureRecognizerResult([], [], [], []), None, timestamp_ms)
+        return True
+
+    @property
+    def last_submit_ms(self) -> int:
+        """Timestamp of the last frame handed to the model, -1 if none were."""
+        return self._last_submit_ms
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.frames_submitted,
+            "skipped": self.frames_skipped,
+            "completed": self.frames_completed,
+            "ticked": self.frames_ticked,
+            "in_flight": len(self._in_flight)
+        }
 
     def _get_time_ms(self):
         if self.start_time is None:
@@ -75,20 +268,36 @@ class GestureModelWrapper(object):
     def __exit__(self, *args):
         self.close()
 
+def _handedness_matches(required: int, actual: int) -> bool:
+    return (required == 0 and actual != 0 and actual != 3) or (required == actual and required != 0)
+
 class GestureData(object):
-    def __init__(self, gesture: str, duration_ms: int, handedness: int):
+    __slots__ = ("code", "duration", "handedness")
+
+    def __init__(self, gesture: Union[str, int], duration_ms: int, handedness: int):
         """_summary_
 
         Args:
-            gesture (str): _description_
+            gesture (Union[str, int]): Gesture name, or its code from GESTURE_CODES.
             duration_ms (int): _description_
             handedness (Set[0, 1, 2, 3]): binary value, each bit corrosponds to each hand, right/left. False for both hands means either hand is accepted.
+
+        Raises:
+            ValueError: If the gesture is not recognized as part of the gesture set.
         """
-        self.gesture = gesture
+        self.code = gesture_code(gesture)
         self.duration = duration_ms # maximum time to consider the gesture, or how long it lasted
 
         self.handedness = handedness
 
+    @property
+    def gesture(self) -> str:
+        return GESTURE_LIST[self.code]
+
+    @gesture.setter
+    def gesture(self, value: Union[str, int]):
+        self.code = gesture_code(value)
+
     def check_handedness(self, hand: Set[Literal["Right", "Left"]]):
         return (
             (self.handedness == 1 and hand == set(["Right"])) # right only b01
@@ -98,83 +307,115 @@ class GestureData(object):
         )
 
     def __repr__(self):
-        return "<GestureData>%s" % str(self.__dict__)
+        return "<GestureData>%s" % str({"gesture": self.gesture, "duration": self.duration, "handedness": self.handedness})
 
     def __eq__(self, other): 
         if not isinstance(other, GestureData):
             # don't attempt to compare against unrelated types
             return NotImplemented
-        return self.gesture == other.gesture and self.duration == other.duration and (
-            (self.handedness == 0 and other.handedness != 0 and other.handedness != 3) or (self.handedness == other.handedness and self.handedness != 0)
-        )
+        return self.code == other.code and self.duration == other.duration and _handedness_matches(self.handedness, other.handedness)
     
     def __contains__(self, other):
         """Evaluates if the other GestureData object meets the criteria of this one."""
         if not isinstance(other, GestureData):
             return False
-        return ((self.duration <= other.duration) and (
-            (self.handedness == 0 and other.handedness != 0 and other.handedness != 3)
-            or (self.handedness == other.handedness and self.handedness != 0))
-            and self.gesture == other.gesture
-        )
+        return self.duration <= other.duration and _handedness_matches(self.handedness, other.handedness) and self.code == other.code
 
 class GestureSequence(object):
+    """Sequence of gestures, stored as packed arrays of gesture codes, durations and hand masks.
+    Indexing and iterating hand out GestureData copies- writes have to go through __setitem__.
+    """
+    __slots__ = ("_codes", "_durations", "_hands", "gesture_mask")
+
     def __init__(self, dat: Union[dict, list, GestureData] = None, *data: Union[dict, list, GestureData]):
-        self._data = list()
+        self._codes = array("B")
+        self._durations = array("q")
+        self._hands = array("B")
         if dat is not None:
             args = (dat, *data)
             if isinstance(dat, dict):
                 for d in args:
-                    self._data.append(GestureData(d["gesture"], d["duration"], d["handedness"]))
+                    self._append(gesture_code(d["gesture"]), d["duration"], d["handedness"])
             elif isinstance(dat, list):
                 for d in args:
-                    self._data.append(GestureData(d[0], d[1], d[2]))
+                    self._append(gesture_code(d[0]), d[1], d[2])
             elif isinstance(dat, GestureData):
                 for d in args:
-                    self._data.append(d)
+                    self._append(d.code, d.duration, d.handedness)
             else:
                 raise ValueError("Invalid input data type.")
         self._update_set()
 
+    def _append(self, code: int, duration_ms: int, handedness: int):
+        self._codes.append(code)
+        self._durations.append(duration_ms)
+        self._hands.append(handedness)
+
+    @classmethod
+    def _from_arrays(cls, codes: array, durations: array, hands: array) -> "GestureSequence":
+        sequence = cls()
+        sequence._codes = codes
+        sequence._durations = durations
+        sequence._hands = hands
+        sequence._update_set()
+        return sequence
+
     def __getitem__(self, index):
         if isinstance(index, slice):
-            return GestureSequence(*self._data[index])
+            return GestureSequence._from_arrays(self._codes[index], self._durations[index], self._hands[index])
         else:
-            return self._data[index]
+            return GestureData(self._codes[index], self._durations[index], self._hands[index])
     
     def __setitem__(self, index, value: GestureData):
-        self._data[index] = value
+        self._codes[index] = value.code
+        self._durations[index] = value.duration
+        self._hands[index] = value.handedness
         self._update_set()
 
     def __len__(self):
-        return len(self._data)
+        return len(self._codes)
 
     def __repr__(self):
-        return "<GestureSequence>%s" % str(self.__dict__)
+        return "<GestureSequence>%s" % str({"_data": self(), "gesture_set": self.gesture_set})
 
     def __call__(self):
-        return self._data
+        return [GestureData(*entry) for entry in zip(self._codes, self._durations, self._hands)]
 
     def __iter__(self):
-        for gesture_data in self._data:
-            yield gesture_data
+        for entry in zip(self._codes, self._durations, self._hands):
+            yield GestureData(*entry)
     
     def _update_set(self):
-        self.gesture_set = set([]) if len(self._data) == 0 else set([gd.gesture for gd in self._data])
+        # bit n is set when gesture code n is somewhere in the sequence
+        mask = 0
+        for code in self._codes:
+            mask |= 1 << code
+        self.gesture_mask = mask
+
+    @property
+    def gesture_set(self) -> Set[str]:
+        return set(gesture for code, gesture in enumerate(GESTURE_LIST) if self.gesture_mask >> code & 1)
 
     def __eq__(self, other: "GestureSequence") -> bool:
         if not isinstance(other, GestureSequence):
             return False
         if (
-            other.gesture_set != other.gesture_set
-            or len(other) != len(self)
+            self.gesture_mask != other.gesture_mask
+            or self._codes != other._codes
+            or self._durations != other._durations
         ): return False
-        idx = 0
-        for gd in self._data:
-            if gd != other[idx]:
+        for hand, other_hand in zip(self._hands, other._hands):
+            if not _handedness_matches(hand, other_hand):
                 return False
-            else:
-                idx += 1
+        return True
+
+    def _window_matches(self, other: "GestureSequence", offset: int) -> bool:
+        for i in range(len(other)):
+            if (
+                self._codes[offset + i] != other._codes[i]
+                or self._durations[offset + i] < other._durations[i]
+                or not _handedness_matches(other._hands[i], self._hands[offset + i])
+            ): return False
         return True
 
     def __contains__(self, other: "GestureSequence") -> bool:
@@ -182,31 +423,21 @@ class GestureSequence(object):
             # don't attempt to compare against unrelated types
             return False
         size_diff = len(self) - len(other)
-        if size_diff < 0:
-            # cannot contain something bigger than itself
+        if size_diff < 0 or other.gesture_mask & ~self.gesture_mask:
+            # cannot contain something bigger than itself, or gestures it doesnt have
             return False
-        if size_diff == 0:
-            if self.gesture_set != other.gesture_set:
-                return False
-            else:
-                for gd, other_gd in zip(self, other):
-                    if gd not in other_gd:
-                        return False
-                return True
-        else:
-            for i in range(size_diff + 1):
-                search_slice = self[i:len(other) + i]
-                if search_slice.gesture_set != other.gesture_set:
-                    continue
-                for gd, other_gd in zip(search_slice, other):
-                    if gd not in other_gd:
-                        return False
+        for i in range(size_diff + 1):
+            if self._window_matches(other, i):
                 return True
+        return False
 
 class GestureTracker(object):
     """We do something finicky here to apply minimum duration for gestures.
     GestureTracker only evaulates/applies the minimum duration threshold when a new gesture is processed, or when sequence_view is called.
     because of this, it is imperative that getter methods be the only way data in GestureTracker is accessed.
+
+    Every update is O(1) (amortized) in the history length- the tracker keeps a running total of the queued durations
+    and a count of entries under the minimum duration instead of rescanning the queue on each frame.
     """
     
     def __init__(self, min_duration_ms: int, gesture_history_length: int, gesture_history_age_ms: int):
@@ -214,6 +445,9 @@ class GestureTracker(object):
         self._history_age = gesture_history_age_ms
         self._data = deque([], maxlen = gesture_history_length)
         self._last_timestamp = 0
+        self._total_duration = 0 # sum of every queued duration, i.e. the age of the oldest entry
+        self._short_count = 0 # queued entries (excluding the last one) under the minimum duration
+        self._view = None # cached sequence_view, cleared on every write
     
     def append(self, gesture: Union[str, None], hand: HANDEDNESS_MASK, timestamp_ms: int):
         """Adds a new gesture to the Tracker.
@@ -227,48 +461,87 @@ class GestureTracker(object):
             ValueError: If the gesture is not recognized as part of the gesture set.
         """        
         self.update_queue_age(timestamp_ms) # shouldnt matter if last timestamp is 0 since thats only when queue is already empty anyways
-        gesture = str(gesture)
-        if gesture not in GESTURE_SET:
-            raise ValueError("%s is not a recognized gesture" % gesture)
-        elif len(self._data) == 0:
-            self._data.append(GestureData(gesture, 0, hand))
+        code = gesture_code(str(gesture))
+        self._view = None
+        if len(self._data) == 0:
+            self._push(GestureData(code, 0, hand))
+            self._last_timestamp = timestamp_ms # otherwise the next frame counts the whole session so far as this gesture's duration
         else:
-            if len(self) == self._data.maxlen:
+            if len(self) == self._data.maxlen and self._has_short():
                 self._apply_duration_threshold()
-            self._data[-1].duration += timestamp_ms - self._last_timestamp
+            elapsed = timestamp_ms - self._last_timestamp
+            self._data[-1].duration += elapsed
+            self._total_duration += elapsed
             self._last_timestamp = timestamp_ms
-            if self._data[-1].gesture != gesture:
-                self._data.append(GestureData(gesture, 0, hand))
-            
+            if self._data[-1].code != code:
+                self._push(GestureData(code, 0, hand))
+
+    def _has_short(self) -> bool:
+        # the last entry doesn't count- it is still growing, and dropping it would restart the gesture being held
+        return self._short_count > 0
+
+    def _push(self, gesture_data: GestureData):
+        if len(self._data) == self._data.maxlen:
+            self._pop_oldest() # deque would drop it silently, but the totals need to know
+        if len(self._data) > 0 and self._data[-1].duration < self._min_duration:
+            self._short_count += 1 # the current last entry is done growing
+        self._data.append(gesture_data)
+        self._total_duration += gesture_data.duration
+
+    def _pop_oldest(self) -> GestureData:
+        oldest = self._data.popleft()
+        self._total_duration -= oldest.duration
+        if len(self._data) == 0:
+            self._short_count = 0
+        elif oldest.duration < self._min_duration:
+            self._short_count -= 1
+        return oldest
+
     def sequence_view(self):
-        return GestureSequence(*(gd for gd in self() if gd.duration >= self._min_duration))
+        if self._view is None:
+            self._view = GestureSequence(*(gd for gd in self._data if gd.duration >= self._min_duration))
+        return self._view
+
+    def recent(self):
+        """Yields the same entries as sequence_view, newest first, without building a GestureSequence."""
+        for gd in reversed(self._data):
+            if gd.duration >= self._min_duration:
+                yield gd
+
+    def current(self) -> Optional[GestureData]:
+        """The newest entry, i.e. the gesture still being held, or None if the tracker is empty. Its duration keeps growing until the gesture changes."""
+        return self._data[-1] if len(self._data) > 0 else None
 
     def update_queue_age(self, timestamp_ms: int = 0): # wtf is this naming idk man
         """prune aged / old gestures from queue"""
-        length = len(self)
         offset_ms = timestamp_ms - self._last_timestamp
-        if length > 0:
-            ages = [sum(g.duration for g in self()[i:]) + offset_ms for i in range(length)]
-            for i in range(length):
-                if ages[i] > self._history_age:
-                    self._data.popleft()
-                else:
-                    # cut down on runtime- the ages get younger the more we loop- stop once we find one that doesnt expire yet
-                    break
+        # the oldest entry is always the oldest, so stop once it doesnt expire yet
+        while len(self._data) > 0 and self._total_duration + offset_ms > self._history_age:
+            self._pop_oldest()
+            self._view = None
+
+    def empty_copy(self) -> "GestureTracker":
+        """New, empty tracker with the same settings, e.g. one per tracked hand."""
+        return GestureTracker(self._min_duration, self._data.maxlen, self._history_age)
+
     def clear_queue(self):
-        self.update_queue_age(self._last_timestamp + self._history_age + 1)
+        self._data.clear()
+        self._total_duration = 0
+        self._short_count = 0
+        self._view = None
 
     def _apply_duration_threshold(self):
         length = len(self) 
         if length > 0:
+            kept = deque([], maxlen = self._data.maxlen)
             for i in range(length):
                 temp = self._data.popleft()
-                if temp.duration >= self._min_duration:
-                    self._data.append(temp)
-                elif i == length - 1: # removing last element, make sure it doesnt add onto a new element
-                    # if we're removing the last element we now have space to add a new one, so this shouldnt be an issue
-                    self._data.append(GestureData("", self._min_duration, 3))
-                    self._last_timestamp = 0
+                if temp.duration >= self._min_duration or i == length - 1: # the last entry is kept, it is still growing
+                    kept.append(temp)
+            self._data = kept
+            self._total_duration = sum(gd.duration for gd in self._data)
+            self._short_count = 0
+            self._view = None
 
     def __call__(self):
         return list(self._data)
@@ -277,4 +550,4 @@ class GestureTracker(object):
         return len(self._data)
 
     def __repr__(self):
-        return "<GestureTracker>{'queue': %s, 'max_len': %d, 'min_duration_ms': %d, 'history_age_ms': %d}" % (str(self()), self._data.maxlen, self._min_duration, self._history_age)
\ No newline at end of file
+        return "<GestureTracker>{'queue': %s, 'max_len': %d, 'min_duration_ms': %d, 'history_age_ms': %d}" % (str(self()), self._data.maxlen, self._min_duration, self._history_age)
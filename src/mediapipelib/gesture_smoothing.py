@@ -0,0 +1,101 @@
+# Module containing the per-hand temporal smoothing of recognizer gesture scores
+import math
+import numpy as np
+from typing import Dict, Hashable, List, Tuple
+from mediapipelib.gesture_recognize import GESTURE_LIST, GESTURE_CODES
+
+class _HandState(object):
+    __slots__ = ("scores", "code", "last_ms")
+
+    def __init__(self):
+        self.scores = np.zeros(256) # one slot per possible gesture code, so gestures registered later fit too
+        self.code = GESTURE_CODES["None"]
+        self.last_ms = None
+
+class GestureSmoother(object):
+    """Smooths each hand's gesture over time before it reaches the GestureTracker, so one misclassified frame doesn't split a held gesture.
+    Every frame, a hand's category scores are folded into an exponential moving average, so confident frames move it more than unsure ones.
+    The reported gesture has hysteresis: a new gesture takes over once its average passes enter and beats the current one by margin,
+    and the current one is only dropped (back to "None") once its average falls under exit.
+
+    Args:
+        tau_ms (float, optional): Time constant of the moving average. Frames are weighted by the time since the last one, so skipped frames don't slow it down. Defaults to 60.
+        enter (float, optional): Average score a gesture needs to be reported. Defaults to 0.5.
+        exit (float, optional): Average score under which the reported gesture is dropped. Defaults to 0.3.
+        margin (float, optional): How far a new gesture's average has to be above the reported one's to replace it. Defaults to 0.1.
+        lost_ms (int, optional): A hand missing for longer than this starts over. Defaults to 250.
+
+    Returns:
+        GestureSmoother object.
+    """
+
+    def __init__(self, tau_ms: float = 60, enter: float = 0.5, exit: float = 0.3, margin: float = 0.1, lost_ms: int = 250):
+        self.tau_ms = tau_ms
+        self.enter = enter
+        self.exit = exit
+        self.margin = margin
+        self.lost_ms = lost_ms
+        self._hands: Dict[Hashable, _HandState] = dict()
+        self.frames = 0
+        self.overridden = 0 # hand frames where the reported gesture wasn't the recognizer's top one
+        self.switches = 0
+
+    def update(self, hand: Hashable, categories: List[Tuple[int, float]], timestamp_ms: int) -> str:
+        """Folds one frame of a hand into its average.
+
+        Args:
+            hand (Hashable): Key the hand is told apart by, e.g. its handedness.
+            categories (List[Tuple[int, float]]): (gesture code, score) for the hand this frame, best first.
+            timestamp_ms (int): Timestamp of the frame.
+
+        Returns:
+            str: The smoothed gesture name for the hand.
+        """
+        state = self._hands.get(hand)
+        if state is None or timestamp_ms - state.last_ms > self.lost_ms:
+            # a new hand starts out at its raw scores and top gesture- reporting "None" first would put a short entry ahead of the gesture in the tracker
+            state = self._hands[hand] = _HandState()
+            state.last_ms = timestamp_ms
+            for code, score in categories:
+                state.scores[code] = score
+            if len(categories) > 0:
+                state.code = categories[0][0]
+            self.frames += 1
+            return GESTURE_LIST[state.code]
+        weight = 1 - math.exp(-max(timestamp_ms - state.last_ms, 0) / self.tau_ms)
+        state.last_ms = timestamp_ms
+        scores = state.scores
+        scores *= 1 - weight
+        for code, score in categories:
+            scores[code] += weight * score
+        best = int(scores.argmax())
+        if best != state.code:
+            current = scores[state.code]
+            if scores[best] >= self.enter and scores[best] >= current + self.margin:
+                state.code = best
+                self.switches += 1
+            elif current < self.exit and state.code != GESTURE_CODES["None"]:
+                state.code = GESTURE_CODES["None"]
+                self.switches += 1
+        self.frames += 1
+        if len(categories) > 0 and categories[0][0] != state.code:
+            self.overridden += 1
+        return GESTURE_LIST[state.code]
+
+    def forget(self, timestamp_ms: int):
+        """Drops hands that haven't been seen for longer than lost_ms."""
+        for hand in [hand for hand, state in self._hands.items() if timestamp_ms - state.last_ms > self.lost_ms]:
+            del self._hands[hand]
+
+    def reset(self):
+        self._hands.clear()
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "overridden": self.overridden,
+            "switches": self.switches
+        }
+
+    def __repr__(self):
+        return "<GestureSmoother>%s" % str(self.stats())
@@ -0,0 +1,114 @@
+# Module containing the tracker that keeps hand identities stable across frames
+import numpy as np
+from typing import Dict, List
+
+_PALM_LANDMARKS = [0, 5, 9, 13, 17] # wrist and knuckles- the palm centre barely moves when the fingers do
+_MAX_PREDICT_MS = 100 # don't extrapolate a missing hand's motion further than this
+_LABEL_WEIGHT = 0.25 # how much one frame's left/right label moves a hand's running vote
+
+def palm_centres(result: "mediapipe.tasks.vision.GestureRecognizerResult") -> np.ndarray:
+    """(hands, 2) palm centre of every hand in result, in frame coordinates."""
+    return np.array([
+        (sum(hand_landmarks[i].x for i in _PALM_LANDMARKS), sum(hand_landmarks[i].y for i in _PALM_LANDMARKS))
+        for hand_landmarks in result.hand_landmarks
+    ], dtype = np.float64).reshape(-1, 2) / len(_PALM_LANDMARKS)
+
+class _Track(object):
+    __slots__ = ("position", "velocity", "right", "last_ms")
+
+    def __init__(self, position: np.ndarray, handedness: str, timestamp_ms: int):
+        self.position = position
+        self.velocity = np.zeros(2) # frame widths/heights per ms
+        self.right = 1.0 if handedness == "Right" else 0.0 # running vote of the hand's labels, 1 for right
+        self.last_ms = timestamp_ms
+
+    @property
+    def handedness(self) -> str:
+        return "Right" if self.right >= 0.5 else "Left"
+
+class HandIdentityTracker(object):
+    """Gives every hand a persistent ID across frames, so per-hand state (trackers, smoothing, trajectories) follows the hand
+    instead of its index in the result or its handedness label, which MediaPipe can swap from one frame to the next.
+    Each frame, the palm centres are matched greedily against where every known hand was predicted to be, nearest first.
+    Each hand also keeps a running vote of its left/right labels, so a label that flips for a frame or two doesn't change which hand it is.
+
+    Args:
+        max_distance (float, optional): Furthest a hand can be from a known hand's predicted position and still be that hand, in frame widths/heights. Defaults to 0.2.
+        handedness_penalty (float, optional): Added to the distance when the handedness label doesn't match, so labels break ties without overriding position. Defaults to 0.05.
+        lost_ms (int, optional): A hand missing for longer than this is forgotten, and gets a new ID if it comes back. Defaults to 300.
+
+    Returns:
+        HandIdentityTracker object.
+    """
+
+    def __init__(self, max_distance: float = 0.2, handedness_penalty: float = 0.05, lost_ms: int = 300):
+        self.max_distance = max_distance
+        self.handedness_penalty = handedness_penalty
+        self.lost_ms = lost_ms
+        self._tracks: Dict[int, _Track] = dict()
+        self._next_id = 0
+        self.dropped: List[int] = [] # IDs forgotten by the last assign() call
+        self.labels: List[str] = [] # voted handedness of each hand in the last assign() call
+        self.ids_issued = 0
+
+    def assign(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", timestamp_ms: int) -> List[int]:
+        """Matches every hand in result to a known hand, or a new ID.
+
+        Args:
+            result (GestureRecognizerResult): Recognizer result, with full-frame landmarks.
+            timestamp_ms (int): Timestamp of the frame.
+
+        Returns:
+            List[int]: ID of each hand, in the same order as result.hand_landmarks.
+        """
+        self.dropped = [hand_id for hand_id, track in self._tracks.items() if timestamp_ms - track.last_ms > self.lost_ms]
+        for hand_id in self.dropped:
+            del self._tracks[hand_id]
+        centres = palm_centres(result)
+        labels = [handedness[0].category_name for handedness in result.handedness]
+        ids = [None] * len(centres)
+        known = list(self._tracks.keys())
+        if len(known) > 0 and len(centres) > 0:
+            tracks = [self._tracks[hand_id] for hand_id in known]
+            predicted = np.array([track.position + track.velocity * min(timestamp_ms - track.last_ms, _MAX_PREDICT_MS) for track in tracks])
+            costs = np.linalg.norm(centres[:, None, :] - predicted[None, :, :], axis = 2) # (hands, known)
+            costs += self.handedness_penalty * (np.array(labels)[:, None] != np.array([track.handedness for track in tracks])[None, :])
+            taken = set()
+            # greedy, cheapest pair first- with a handful of hands this is as good as the Hungarian algorithm
+            for flat in np.argsort(costs, axis = None):
+                hand, k = divmod(int(flat), len(known))
+                if costs[hand, k] > self.max_distance:
+                    break
+                if ids[hand] is not None or k in taken:
+                    continue
+                ids[hand] = known[k]
+                taken.add(k)
+        for hand, centre in enumerate(centres):
+            if ids[hand] is None:
+                ids[hand] = self._next_id
+                self._next_id += 1
+                self.ids_issued += 1
+                self._tracks[ids[hand]] = _Track(centre, labels[hand], timestamp_ms)
+                continue
+            track = self._tracks[ids[hand]]
+            if timestamp_ms > track.last_ms:
+                track.velocity = (centre - track.position) / (timestamp_ms - track.last_ms)
+            track.position = centre
+            track.right += _LABEL_WEIGHT * ((labels[hand] == "Right") - track.right)
+            track.last_ms = timestamp_ms
+        self.labels = [self._tracks[hand_id].handedness for hand_id in ids]
+        return ids
+
+    def reset(self):
+        self.dropped = list(self._tracks.keys())
+        self.labels = []
+        self._tracks.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hands": len(self._tracks),
+            "ids_issued": self.ids_issued
+        }
+
+    def __repr__(self):
+        return "<HandIdentityTracker>%s" % str(self.stats())
@@ -0,0 +1,238 @@
+# Module containing trajectory tracking and matching for motion gestures (swipes and flicks)
+import numpy as np
+from typing import Dict, Hashable, List, Optional
+from mediapipelib.gesture_recognize import EITHER_HAND, LEFT_HAND, RIGHT_HAND
+from mediapipelib.gesture_match import binding_items
+from mediapipelib.hand_identity import palm_centres
+
+DIRECTIONS = {
+    "left": (-1.0, 0.0),
+    "right": (1.0, 0.0),
+    "up": (0.0, -1.0), # image y grows downwards
+    "down": (0.0, 1.0)
+}
+
+class Swipe(object):
+    """Motion binding for the gestures table: a hand moving mostly in one direction, far and fast enough, within a short window.
+    Can be bound on its own, or next to a GestureSequence in a list, e.g. "next": [GestureSequence(...), Flick("up")].
+    Positions are fractions of the frame, and directions are as seen in the camera preview (which is not mirrored).
+
+    Args:
+        direction (str): "left", "right", "up" or "down".
+        handedness (int, optional): RIGHT_HAND, LEFT_HAND or EITHER_HAND. Defaults to EITHER_HAND.
+        min_distance (float, optional): How far the palm has to travel along direction inside the window, in frame widths/heights. Defaults to 0.25.
+        min_speed (float, optional): Peak speed along direction, in frames per second. Defaults to 0.8.
+        window_ms (int, optional): How far back the motion is measured. Defaults to 400.
+        min_accel (float, optional): Peak acceleration, in frames per second squared. None to not check it. Defaults to None.
+        straightness (float, optional): How many times longer the motion has to be along direction than across it. Defaults to 2.
+
+    Raises:
+        ValueError: If direction or handedness is not recognized.
+
+    Returns:
+        Swipe object.
+    """
+
+    def __init__(self, direction: str, handedness: int = EITHER_HAND, min_distance: float = 0.25, min_speed: float = 0.8, window_ms: int = 400, min_accel: float = None, straightness: float = 2):
+        if direction not in DIRECTIONS:
+            raise ValueError("%s is not a recognized swipe direction" % direction)
+        if handedness not in (EITHER_HAND, LEFT_HAND, RIGHT_HAND):
+            raise ValueError("Motion gestures are tracked per hand, BOTH_HANDS is not supported")
+        self.direction = direction
+        self.handedness = handedness
+        self.min_distance = min_distance
+        self.min_speed = min_speed
+        self.window_ms = window_ms
+        self.min_accel = min_accel
+        self.straightness = straightness
+
+    def __repr__(self):
+        return "<%s>%s" % (type(self).__name__, str({"direction": self.direction, "handedness": self.handedness, "window_ms": self.window_ms}))
+
+class Flick(Swipe):
+    """Swipe tuned for a short, sharp flick of the hand: less distance, a shorter window, and a burst of acceleration.
+    Fires while the hand is still moving, usually within three or four frames of the flick starting.
+
+    Args:
+        direction (str): "left", "right", "up" or "down".
+        handedness (int, optional): RIGHT_HAND, LEFT_HAND or EITHER_HAND. Defaults to EITHER_HAND.
+        min_distance (float, optional): Defaults to 0.1.
+        min_speed (float, optional): Defaults to 1.2.
+        window_ms (int, optional): Defaults to 150.
+        min_accel (float, optional): Defaults to 8.
+        straightness (float, optional): Defaults to 1.5.
+    """
+
+    def __init__(self, direction: str, handedness: int = EITHER_HAND, min_distance: float = 0.1, min_speed: float = 1.2, window_ms: int = 150, min_accel: float = 8, straightness: float = 1.5):
+        super().__init__(direction, handedness, min_distance, min_speed, window_ms, min_accel, straightness)
+
+class HandTrajectory(object):
+    """Fixed-size ring buffer of one hand's palm positions. Velocity and acceleration are worked out as each sample comes in,
+    so matching only has to look at the stored rows.
+
+    Args:
+        capacity (int, optional): Samples kept. Should cover the longest Swipe window at the camera's frame rate. Defaults to 32.
+
+    Returns:
+        HandTrajectory object.
+    """
+    # columns of each sample
+    T, X, Y, VX, VY, ACCEL = range(6)
+
+    def __init__(self, capacity: int = 32):
+        self._samples = np.zeros((capacity, 6))
+        self._next = 0
+        self.count = 0
+        self.first_ms = None # when the hand was first seen since the last clear()
+
+    def append(self, timestamp_ms: int, x: float, y: float):
+        row = self._samples[self._next]
+        row[self.T], row[self.X], row[self.Y] = timestamp_ms, x, y
+        row[self.VX] = row[self.VY] = row[self.ACCEL] = 0
+        if self.count > 0:
+            last = self._samples[self._next - 1] # wraps to the end of the buffer for index 0
+            dt = (timestamp_ms - last[self.T]) / 1000
+            if dt > 0:
+                row[self.VX] = (x - last[self.X]) / dt
+                row[self.VY] = (y - last[self.Y]) / dt
+                row[self.ACCEL] = np.hypot(row[self.VX] - last[self.VX], row[self.VY] - last[self.VY]) / dt
+        else:
+            self.first_ms = timestamp_ms
+        self._next = (self._next + 1) % len(self._samples)
+        self.count = min(self.count + 1, len(self._samples))
+
+    @property
+    def last_ms(self) -> Optional[float]:
+        return None if self.count == 0 else self._samples[self._next - 1, self.T]
+
+    def samples(self) -> np.ndarray:
+        """Stored samples, oldest first."""
+        if self.count < len(self._samples):
+            return self._samples[:self.count]
+        return np.concatenate((self._samples[self._next:], self._samples[:self._next]))
+
+    def reset(self):
+        """Forgets the trajectory entirely."""
+        self._next = 0
+        self.count = 0
+        self.first_ms = None
+
+    def clear(self):
+        """Forgets the trajectory, keeping the newest sample as the start of the next one."""
+        if self.count == 0:
+            return
+        newest = self._samples[self._next - 1].copy()
+        newest[self.VX:] = 0
+        self._samples[0] = newest
+        self._next = 1 % len(self._samples)
+        self.count = 1
+        self.first_ms = newest[self.T]
+
+class MotionMatcher(object):
+    """Tracks each hand's palm trajectory and matches it against every Swipe/Flick binding in the gestures table at once.
+    Bindings are compiled into arrays (direction vectors and thresholds), so one frame costs a few vectorized operations per hand in view.
+    Hands are told apart by the keys passed to update(), e.g. IDs from a HandIdentityTracker, or by handedness when there are none.
+
+    Args:
+        gestures (Dict[str, Any]): The gestures table. Anything that isn't a Swipe is ignored, so GestureMatcher can take the same table.
+        capacity (int, optional): Samples kept per hand. Defaults to 32.
+        settle_ms (int, optional): How long a hand has to be in view before its motion counts, so a hand coming into frame isn't a swipe. Defaults to 150.
+        lost_ms (int, optional): A hand missing for longer than this starts a new trajectory. Defaults to 250.
+        cooldown_ms (int, optional): After a hand fires, its motion is ignored for this long, so the hand coming back doesn't fire the opposite direction. Defaults to 400.
+
+    Returns:
+        MotionMatcher object.
+    """
+
+    def __init__(self, gestures: Dict[str, object], capacity: int = 32, settle_ms: int = 150, lost_ms: int = 250, cooldown_ms: int = 400):
+        self.bindings = [(priority, name, binding) for priority, name, binding in binding_items(gestures) if isinstance(binding, Swipe)]
+        self.settle_ms = settle_ms
+        self.lost_ms = lost_ms
+        self.cooldown_ms = cooldown_ms
+        self._names = [name for _, name, _ in self.bindings]
+        self._handedness = np.array([binding.handedness for _, _, binding in self.bindings], dtype = np.int64)
+        self._directions = np.array([DIRECTIONS[binding.direction] for _, _, binding in self.bindings]).reshape(-1, 2)
+        self._across = self._directions[:, ::-1] * (1, -1) # perpendicular to each direction
+        self._windows = np.array([binding.window_ms for _, _, binding in self.bindings], dtype = np.float64)
+        self._longest_window = self._windows.max() if len(self.bindings) > 0 else 0
+        self._min_distance = np.array([binding.min_distance for _, _, binding in self.bindings])
+        self._min_speed = np.array([binding.min_speed for _, _, binding in self.bindings])
+        self._min_accel = np.array([-np.inf if binding.min_accel is None else binding.min_accel for _, _, binding in self.bindings])
+        self._straightness = np.array([binding.straightness for _, _, binding in self.bindings])
+        self.capacity = capacity
+        self._hands: Dict[Hashable, HandTrajectory] = dict()
+        self._cooldown_until: Dict[Hashable, float] = dict()
+        self.matches = 0
+
+    def _match_hand(self, key: Hashable, hand: int, trajectory: HandTrajectory, timestamp_ms: int) -> Optional[int]:
+        if timestamp_ms < self._cooldown_until.get(key, -np.inf) or timestamp_ms - trajectory.first_ms < self.settle_ms or trajectory.count < 3:
+            return None
+        samples = trajectory.samples()
+        samples = samples[np.searchsorted(samples[:, HandTrajectory.T], timestamp_ms - self._longest_window):] # only what the longest window can see
+        times = samples[:, HandTrajectory.T]
+        # per binding: where its window starts, how far the palm got since then, and the peaks inside the window
+        starts = np.searchsorted(times, timestamp_ms - self._windows)
+        inside = np.arange(len(times))[:, None] >= starts # (samples, bindings)
+        travel = samples[-1, HandTrajectory.X:HandTrajectory.Y + 1] - samples[np.minimum(starts, len(times) - 1), HandTrajectory.X:HandTrajectory.Y + 1]
+        along = np.einsum("bk,bk->b", travel, self._directions)
+        across = np.abs(np.einsum("bk,bk->b", travel, self._across))
+        speed = np.where(inside, samples[:, HandTrajectory.VX:HandTrajectory.VY + 1] @ self._directions.T, -np.inf).max(axis = 0)
+        accel = np.where(inside, samples[:, HandTrajectory.ACCEL:HandTrajectory.ACCEL + 1], -np.inf).max(axis = 0)
+        matched = (
+            ((self._handedness == EITHER_HAND) | (self._handedness == hand))
+            & (along >= self._min_distance)
+            & (along >= self._straightness * across)
+            & (speed >= self._min_speed)
+            & (accel >= self._min_accel)
+        )
+        return int(matched.argmax()) if matched.any() else None # bindings are in priority order
+
+    def update(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", timestamp_ms: int, hands: List[Hashable] = None) -> Optional[str]:
+        """Adds every hand in result to its trajectory and checks the motion bindings.
+
+        Args:
+            result (GestureRecognizerResult): Recognizer result, with full-frame landmarks.
+            timestamp_ms (int): Timestamp of the frame.
+            hands (List[Hashable], optional): Key for each hand in result, e.g. from HandIdentityTracker.assign. Defaults to the hands' handedness.
+
+        Returns:
+            Optional[str]: Name of the matched binding, or None.
+        """
+        if len(self.bindings) == 0:
+            return None
+        best = None
+        for key in [key for key, trajectory in self._hands.items() if trajectory.count == 0 or timestamp_ms - trajectory.last_ms > self.lost_ms]:
+            del self._hands[key] # gone for too long, start over when it comes back
+            self._cooldown_until.pop(key, None)
+        hand_masks = [LEFT_HAND if handedness[0].category_name == "Left" else RIGHT_HAND for handedness in result.handedness]
+        for key, hand, (x, y) in zip(hand_masks if hands is None else hands, hand_masks, palm_centres(result)):
+            trajectory = self._hands.get(key)
+            if trajectory is None:
+                trajectory = self._hands[key] = HandTrajectory(self.capacity)
+            elif trajectory.last_ms >= timestamp_ms:
+                continue # second hand with the same key this frame
+            trajectory.append(timestamp_ms, x, y)
+            found = self._match_hand(key, hand, trajectory, timestamp_ms)
+            if found is not None:
+                trajectory.clear()
+                self._cooldown_until[key] = timestamp_ms + self.cooldown_ms
+                if best is None or found < best:
+                    best = found
+        if best is None:
+            return None
+        self.matches += 1
+        return self._names[best]
+
+    def reset(self):
+        """Forgets every trajectory, e.g. after another binding fired."""
+        for trajectory in self._hands.values():
+            trajectory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "bindings": len(self.bindings),
+            "matches": self.matches
+        }
+
+    def __repr__(self):
+        return "<MotionMatcher>%s" % str(self.stats())
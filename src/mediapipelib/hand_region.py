@@ -0,0 +1,117 @@
+# Module containing the region-of-interest tracker that picks what part of each frame the recognizer sees
+import cv2
+import numpy as np
+from typing import NamedTuple, Tuple
+
+class Region(NamedTuple):
+    """Pixel rectangle of the source frame that was handed to the model."""
+    x: int
+    y: int
+    width: int
+    height: int
+    frame_width: int
+    frame_height: int
+
+class HandRegionTracker(object):
+    """Crops and downscales frames before they reach the recognizer.
+    While hands are tracked the model only gets a padded box around them, and while searching it gets the whole frame at a low resolution.
+    Landmarks in results are mapped back to full-frame coordinates with remap(), so nothing downstream needs to know about the crop.
+
+    Args:
+        padding (float, optional): Space added around the hands on every side, as a fraction of the box size. Defaults to 0.6.
+        track_size (int, optional): Longest side in pixels of the crop while tracking. Defaults to 256.
+        search_size (int, optional): Longest side in pixels of the full frame while searching. Defaults to 320.
+        min_region (float, optional): Smallest crop side, as a fraction of the frame's shorter side. Defaults to 0.3.
+        lost_frames (int, optional): Consecutive results without hands before going back to searching. Defaults to 3.
+
+    Returns:
+        HandRegionTracker object.
+    """
+
+    def __init__(self, padding: float = 0.6, track_size: int = 256, search_size: int = 320, min_region: float = 0.3, lost_frames: int = 3):
+        self.padding = padding
+        self.track_size = track_size
+        self.search_size = search_size
+        self.min_region = min_region
+        self.lost_frames = lost_frames
+        self._box = None # normalized (x0, y0, x1, y1) around the hands in the last result, None while searching
+        self._misses = 0
+        self._buffers = dict() # output shape -> reused resize buffer
+        self.frames_tracked = 0
+        self.frames_searched = 0
+
+    @property
+    def tracking(self) -> bool:
+        return self._box is not None
+
+    def _region(self, frame_width: int, frame_height: int) -> Region:
+        box = self._box
+        if box is None:
+            return Region(0, 0, frame_width, frame_height, frame_width, frame_height)
+        x0, y0, x1, y1 = box[0] * frame_width, box[1] * frame_height, box[2] * frame_width, box[3] * frame_height
+        # square box, so hands keep their aspect ratio when downscaled
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.padding)
+        side = int(min(max(side, self.min_region * min(frame_width, frame_height)), frame_width, frame_height))
+        x = int(min(max((x0 + x1) / 2 - side / 2, 0), frame_width - side))
+        y = int(min(max((y0 + y1) / 2 - side / 2, 0), frame_height - side))
+        return Region(x, y, side, side, frame_width, frame_height)
+
+    def crop(self, rgb_frame: np.ndarray) -> Tuple[np.ndarray, Region]:
+        """Cuts the current region out of the frame and downscales it.
+
+        Args:
+            rgb_frame (numpy.ndarray): Full RGB frame.
+
+        Returns:
+            Tuple[numpy.ndarray, Region]: Contiguous image to hand to the model, and the region it came from.
+        """
+        frame_height, frame_width = rgb_frame.shape[:2]
+        region = self._region(frame_width, frame_height)
+        if self._box is None:
+            self.frames_searched += 1
+            size = self.search_size
+        else:
+            self.frames_tracked += 1
+            size = self.track_size
+        scale = min(1, size / max(region.width, region.height))
+        shape = (max(1, int(region.height * scale)), max(1, int(region.width * scale)), rgb_frame.shape[2])
+        buffer = self._buffers.get(shape)
+        if buffer is None:
+            buffer = self._buffers[shape] = np.empty(shape, dtype = rgb_frame.dtype)
+        cv2.resize(rgb_frame[region.y:region.y + region.height, region.x:region.x + region.width], (shape[1], shape[0]), dst = buffer, interpolation = cv2.INTER_AREA)
+        return buffer, region
+
+    def remap(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", region: Region):
+        """Maps landmarks from crop coordinates back to full-frame coordinates, in place, then moves the region to follow the hands."""
+        if region is not None:
+            scale_x = region.width / region.frame_width
+            scale_y = region.height / region.frame_height
+            offset_x = region.x / region.frame_width
+            offset_y = region.y / region.frame_height
+            for hand_landmarks in result.hand_landmarks:
+                for landmark in hand_landmarks:
+                    landmark.x = offset_x + landmark.x * scale_x
+                    landmark.y = offset_y + landmark.y * scale_y
+                    landmark.z = landmark.z * scale_x # z uses the same scale as x
+        self.update(result)
+
+    def update(self, result: "mediapipe.tasks.vision.GestureRecognizerResult"):
+        if len(result.hand_landmarks) == 0:
+            self._misses += 1
+            if self._misses >= self.lost_frames:
+                self._box = None
+            return
+        self._misses = 0
+        xs = [landmark.x for hand_landmarks in result.hand_landmarks for landmark in hand_landmarks]
+        ys = [landmark.y for hand_landmarks in result.hand_landmarks for landmark in hand_landmarks]
+        self._box = (min(xs), min(ys), max(xs), max(ys))
+
+    def stats(self) -> dict:
+        return {
+            "tracking": self.tracking,
+            "tracked": self.frames_tracked,
+            "searched": self.frames_searched
+        }
+
+    def __repr__(self):
+        return "<HandRegionTracker>%s" % str(self.stats())
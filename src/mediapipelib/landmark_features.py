@@ -0,0 +1,185 @@
+# Module containing the landmark geometry features and the classifier for custom static poses
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from mediapipelib.gesture_recognize import GESTURE_LIST, register_gesture
+
+FINGERS = ["thumb", "index", "middle", "ring", "pinky"]
+# landmark indices from the wrist out to the tip of each finger, see https://ai.google.dev/edge/mediapipe/solutions/vision/hand_landmarker
+_CHAINS = [[0, 1, 2, 3, 4], [0, 5, 6, 7, 8], [0, 9, 10, 11, 12], [0, 13, 14, 15, 16], [0, 17, 18, 19, 20]]
+_JOINTS = [["cmc", "mcp", "ip"], ["mcp", "pip", "dip"], ["mcp", "pip", "dip"], ["mcp", "pip", "dip"], ["mcp", "pip", "dip"]]
+_TIPS = [4, 8, 12, 16, 20]
+_PAIRS = [(a, b) for a in range(5) for b in range(a + 1, 5)]
+
+# every feature is built from vectors between two landmarks, so they are all gathered and measured in one go.
+# vectors: joint -> previous landmark, joint -> next landmark (for every joint angle), tip -> tip, wrist -> tip, wrist -> middle knuckle for the palm length,
+# then wrist -> index knuckle and wrist -> pinky knuckle for the palm normal
+_ANGLE_A = [chain[i - 1] for chain in _CHAINS for i in range(1, 4)]
+_ANGLE_B = [chain[i] for chain in _CHAINS for i in range(1, 4)]
+_ANGLE_C = [chain[i + 1] for chain in _CHAINS for i in range(1, 4)]
+_VECTORS = np.array([
+    _ANGLE_A + _ANGLE_C + [_TIPS[b] for a, b in _PAIRS] + _TIPS + [9, 5, 17], # to
+    _ANGLE_B + _ANGLE_B + [_TIPS[a] for a, b in _PAIRS] + [0] * 5 + [0, 0, 0] # from
+])
+_ANGLE_COUNT = len(_ANGLE_B)
+_LENGTHS = slice(2 * _ANGLE_COUNT, -3)
+_PALM = -3
+# the cross product's index.yzx, pinky.zxy, index.zxy and pinky.yzx, picked out of the last two vectors in one go
+_CROSS_ROWS = np.array([[-2], [-1], [-2], [-1]])
+_CROSS_AXES = np.array([[1, 2, 0], [2, 0, 1], [2, 0, 1], [1, 2, 0]])
+
+FEATURE_NAMES = (
+    ["%s_%s" % (finger, joint) for finger, joints in zip(FINGERS, _JOINTS) for joint in joints] # joint angles, degrees. 180 is straight
+    + ["%s_%s" % (FINGERS[a], FINGERS[b]) for a, b in _PAIRS] # fingertip to fingertip distances, in palm lengths
+    + ["%s_wrist" % finger for finger in FINGERS] # fingertip to wrist distances, in palm lengths
+    + ["palm_x", "palm_y", "palm_z"] # palm normal. points out of the palm for both hands
+)
+FEATURE_INDEX = {name: index for index, name in enumerate(FEATURE_NAMES)}
+# brings angles (degrees) and distances (palm lengths) to similar ranges for nearest-centroid distances
+FEATURE_SCALE = np.array([np.pi / 180 if index < _ANGLE_COUNT else 1.0 for index in range(len(FEATURE_NAMES))])
+
+def landmark_array(result: "mediapipe.tasks.vision.GestureRecognizerResult") -> np.ndarray:
+    """Copies every hand's landmarks out of a result into one (hands, 21, 3) array."""
+    return np.array([[(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks] for hand_landmarks in result.hand_landmarks], dtype = np.float64).reshape(-1, 21, 3)
+
+def hand_features(points: np.ndarray, left: np.ndarray = None) -> np.ndarray:
+    """Turns landmarks into a row of FEATURE_NAMES per hand, for every hand at once.
+
+    Args:
+        points (numpy.ndarray): (hands, 21, 3) landmarks, e.g. from landmark_array.
+        left (numpy.ndarray, optional): (hands,) bool, True for left hands. Flips their palm normal so it matches a right hand's. Defaults to all right hands.
+
+    Returns:
+        numpy.ndarray: (hands, len(FEATURE_NAMES)) features.
+    """
+    ends = points[:, _VECTORS]
+    vectors = ends[:, 0] - ends[:, 1]
+    lengths = np.sqrt(np.einsum("hvk,hvk->hv", vectors, vectors))
+    cosine = np.einsum("hjk,hjk->hj", vectors[:, :_ANGLE_COUNT], vectors[:, _ANGLE_COUNT:2 * _ANGLE_COUNT])
+    cosine /= np.maximum(lengths[:, :_ANGLE_COUNT] * lengths[:, _ANGLE_COUNT:2 * _ANGLE_COUNT], 1e-9)
+    angles = np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+    # distances in units of the wrist -> middle finger knuckle length, so they don't depend on how far the hand is from the camera
+    distances = lengths[:, _LENGTHS] / np.maximum(lengths[:, _PALM:_PALM + 1], 1e-9)
+    # np.cross is slow on tiny arrays, so the cross product is written out
+    cross = vectors[:, _CROSS_ROWS, _CROSS_AXES]
+    normal = cross[:, 0] * cross[:, 1] - cross[:, 2] * cross[:, 3]
+    normal /= np.maximum(np.sqrt(np.einsum("hk,hk->h", normal, normal)), 1e-9)[:, None]
+    if left is not None:
+        normal[left] *= -1
+    return np.concatenate([angles, distances, normal], axis = 1)
+
+class PoseClassifier(object):
+    """Recognizes user-defined static poses from landmark geometry, on top of the recognizer's eight canned gestures.
+    Poses are either rules (allowed ranges for some features) or prototypes (the average of recorded feature rows, matched by nearest centroid).
+    Both are compiled into arrays, so every hand in a frame is classified in a handful of vectorized operations.
+    Every pose name is registered with register_gesture, so it can be used in GestureSequences like any built-in gesture.
+
+    Args:
+        max_distance (float, optional): Furthest a hand can be from a prototype's centroid, in scaled feature units, and still match it. Defaults to 1.5.
+
+    Returns:
+        PoseClassifier object.
+    """
+
+    def __init__(self, max_distance: float = 1.5):
+        self.max_distance = max_distance
+        self._rules: List[Tuple[int, Dict[str, Tuple[float, float]]]] = []
+        self._prototypes: List[Tuple[int, np.ndarray]] = []
+        self._compiled = False
+        self.hands_classified = 0
+        self.hands_matched = 0
+
+    def add_rule(self, gesture: str, **ranges: Tuple[float, float]) -> int:
+        """Adds a pose that matches when every given feature is inside its range. Rules are checked in the order they were added.
+
+        Args:
+            gesture (str): Name of the pose.
+            **ranges (Tuple[float, float]): FEATURE_NAMES mapped to (low, high). Either end can be None to leave it open, e.g. index_pip = (160, None).
+
+        Raises:
+            ValueError: If a feature name is not recognized.
+
+        Returns:
+            int: Gesture code of the pose.
+        """
+        for feature in ranges:
+            if feature not in FEATURE_INDEX:
+                raise ValueError("%s is not a recognized landmark feature" % feature)
+        code = register_gesture(gesture)
+        self._rules.append((code, ranges))
+        self._compiled = False
+        return code
+
+    def add_prototype(self, gesture: str, samples: np.ndarray) -> int:
+        """Adds a pose that matches hands close to the centroid of samples. Only used when no rule matches.
+
+        Args:
+            gesture (str): Name of the pose.
+            samples (numpy.ndarray): (n, len(FEATURE_NAMES)) or (len(FEATURE_NAMES),) feature rows from hand_features, e.g. recorded while holding the pose.
+
+        Returns:
+            int: Gesture code of the pose.
+        """
+        samples = np.asarray(samples, dtype = np.float64).reshape(-1, len(FEATURE_NAMES))
+        code = register_gesture(gesture)
+        self._prototypes.append((code, samples.mean(axis = 0)))
+        self._compiled = False
+        return code
+
+    def _compile(self):
+        feature_count = len(FEATURE_NAMES)
+        self._low = np.full((len(self._rules), feature_count), -np.inf)
+        self._high = np.full((len(self._rules), feature_count), np.inf)
+        for row, (code, ranges) in enumerate(self._rules):
+            for feature, (low, high) in ranges.items():
+                if low is not None:
+                    self._low[row, FEATURE_INDEX[feature]] = low
+                if high is not None:
+                    self._high[row, FEATURE_INDEX[feature]] = high
+        # rules score their position, prototypes the squared distance after every rule, so the lowest score is the first matching rule,
+        # or the nearest prototype when no rule matches
+        self._rule_order = np.arange(len(self._rules), dtype = np.float64)
+        self._centroids = np.array([centroid for _, centroid in self._prototypes]).reshape(-1, feature_count) * FEATURE_SCALE
+        self._codes = np.array([0] + [code for code, _ in self._rules] + [code for code, _ in self._prototypes], dtype = np.int64)
+        self._compiled = True
+
+    def classify(self, features: np.ndarray) -> np.ndarray:
+        """Classifies a batch of hands.
+
+        Args:
+            features (numpy.ndarray): (hands, len(FEATURE_NAMES)) rows from hand_features.
+
+        Returns:
+            numpy.ndarray: (hands,) gesture codes, 0 where no pose matched.
+        """
+        if not self._compiled:
+            self._compile()
+        rows = features[:, None, :]
+        inside = ((rows >= self._low) & (rows <= self._high)).all(axis = 2) # (hands, rules)
+        offsets = rows * FEATURE_SCALE - self._centroids # (hands, prototypes, features)
+        distances = np.einsum("hpf,hpf->hp", offsets, offsets) # squared
+        scores = np.concatenate([
+            np.full((len(features), 1), np.inf), # no match
+            np.where(inside, self._rule_order, np.inf),
+            np.where(distances <= self.max_distance ** 2, len(self._rules) + distances, np.inf)
+        ], axis = 1)
+        codes = self._codes[scores.argmin(axis = 1)]
+        self.hands_classified += len(features)
+        self.hands_matched += int(np.count_nonzero(codes))
+        return codes
+
+    def classify_result(self, result: "mediapipe.tasks.vision.GestureRecognizerResult") -> List[Optional[str]]:
+        """Classifies every hand in a recognizer result. Returns the pose name for each hand, None where no pose matched."""
+        if len(result.hand_landmarks) == 0 or len(self._rules) + len(self._prototypes) == 0:
+            return []
+        left = np.array([len(handedness) > 0 and handedness[0].category_name == "Left" for handedness in result.handedness], dtype = bool)
+        codes = self.classify(hand_features(landmark_array(result), left))
+        return [GESTURE_LIST[code] if code != 0 else None for code in codes]
+
+    def stats(self) -> dict:
+        return {
+            "classified": self.hands_classified,
+            "matched": self.hands_matched
+        }
+
+    def __repr__(self):
+        return "<PoseClassifier>%s" % str(self.stats())
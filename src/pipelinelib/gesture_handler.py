@@ -0,0 +1,222 @@
+# Module containing the result handler that turns recognizer output into browser actions
+from mediapipelib.gesture_recognize import GestureTracker, BOTH_HANDS, LEFT_HAND, RIGHT_HAND, gesture_code
+from mediapipelib.gesture_match import GestureMatcher
+from webdriverlib.action_queue import ActionExecutor
+from time import perf_counter
+from typing import Callable, Dict, List
+import threading
+import traceback
+
+class GestureHandler(object):
+    """Result callback for GestureModelWrapper. Feeds each result into a GestureTracker, and submits the action of any matching binding.
+    Without a HandIdentityTracker, only designed for a maximum of two hands per frame. Things will get weird/unintended behaviour if there are more.
+    With one, every hand gets its own tracker, and tracker only gets two-hand (BOTH_HANDS) gestures. Hands in a pair go to tracker instead of their own.
+    With speculate set, a binding the held gesture is on its way to is armed on the executor ahead of time, so it is prepared and runs the moment its hold time is up,
+    instead of on the next frame. It is aborted if the gesture changes first.
+    Calls are serialized, since results can come from MediaPipe's callback thread and GestureModelWrapper.tick at the same time.
+
+    Args:
+        tracker (GestureTracker): Tracker the recognized gestures are appended to.
+        matcher (GestureMatcher): Compiled gesture bindings.
+        executor (ActionExecutor): Runs the actions of matched bindings.
+        annotate (Callable[[mediapipe.Image, GestureRecognizerResult], numpy.ndarray], optional): Builds the preview image returned to the wrapper. No preview when None. Defaults to None.
+        error_image (Callable[[], numpy.ndarray], optional): Builds the preview image returned when handling a result fails. Defaults to None.
+        info_msgs (bool, optional): Print a line whenever an action is submitted. Defaults to True.
+        metrics (PipelineMetrics, optional): Records the inference, tracker and match stages. Defaults to None.
+        poses (PoseClassifier, optional): Custom static poses. A hand that matches one is tracked as that pose instead of the recognizer's gesture. Defaults to None.
+        motion (MotionMatcher, optional): Matches swipes and flicks from the hands' trajectories, checked after the GestureSequence bindings. Defaults to None.
+        smoother (GestureSmoother, optional): Smooths each hand's gesture scores over time before they reach the tracker. Defaults to None.
+        hands (HandIdentityTracker, optional): Keeps hand IDs stable across frames, so per-hand state follows each hand instead of its handedness label. Defaults to None.
+        speculate (float, optional): Lowest score the hands holding a gesture can have for its binding to be armed early. No speculation when None. Defaults to None.
+
+    Returns:
+        GestureHandler object, called with (result, output_image, timestamp_ms).
+    """
+
+    def __init__(self, tracker: GestureTracker, matcher: GestureMatcher, executor: ActionExecutor, annotate: Callable = None, error_image: Callable = None, info_msgs: bool = True, metrics = None, poses = None, motion = None, smoother = None, hands = None, speculate: float = None):
+        self.tracker = tracker
+        self.matcher = matcher
+        self.executor = executor
+        self._annotate = annotate
+        self._error_image = error_image
+        self._info_msgs = info_msgs
+        self.metrics = metrics
+        self.poses = poses
+        self.motion = motion
+        self.smoother = smoother
+        self.hands = hands
+        self._hand_trackers: Dict[int, GestureTracker] = dict() # hand ID -> its tracker, with a HandIdentityTracker
+        self._hand_masks: Dict[int, int] = dict() # hand ID -> hand mask its tracker's entries were made with
+        self.speculate = speculate
+        self._motion_match = None # motion binding matched by the last _track() call
+        self._scores: list = [] # (hand ID or None, gesture, score) of every hand in the last _track() call, for speculation
+        self._lock = threading.Lock()
+
+    def _gestures(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", timestamp_ms: int, ids: List[int] = None) -> list:
+        """Gesture name for each hand in result, with custom poses taking priority over the recognizer's gestures. ids key the smoothing per hand, instead of handedness."""
+        poses = self.poses.classify_result(result) if self.poses is not None else []
+        if self.smoother is None:
+            gestures = [categories[0].category_name for categories in result.gestures]
+            for i, pose in enumerate(poses):
+                if pose is not None and i < len(gestures):
+                    gestures[i] = pose
+            if self.speculate is not None:
+                self._record_scores(result, ids, gestures, poses)
+            return gestures
+        gestures = []
+        for i, (handedness, categories) in enumerate(zip(result.handedness, result.gestures)):
+            if i < len(poses) and poses[i] is not None:
+                scores = [(gesture_code(poses[i]), 1.0)] # a pose is matched on geometry, so it counts as fully confident
+            else:
+                scores = [(gesture_code(category.category_name), category.score) for category in categories]
+            gestures.append(self.smoother.update(handedness[0].category_name if ids is None else ids[i], scores, timestamp_ms))
+        self.smoother.forget(timestamp_ms)
+        if self.speculate is not None:
+            self._record_scores(result, ids, gestures, poses)
+        return gestures
+
+    def _record_scores(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", ids: List[int], gestures: list, poses: list):
+        """Keeps how sure this frame is of each hand's gesture. Poses count as fully confident, and a gesture the smoother kept that isn't in the categories as not at all."""
+        self._scores = []
+        for i, (gesture, categories) in enumerate(zip(gestures, result.gestures)):
+            if i < len(poses) and poses[i] is not None:
+                score = 1.0
+            else:
+                score = next((category.score for category in categories if category.category_name == gesture), 0.0)
+            self._scores.append((None if ids is None else ids[i], gesture, score))
+
+    def _track_hands(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", timestamp_ms: int, ids: List[int], gestures_list: list):
+        for hand_id in self.hands.dropped:
+            tracker = self._hand_trackers.pop(hand_id, None)
+            self._hand_masks.pop(hand_id, None)
+            if tracker is not None:
+                self.matcher.reset(tracker)
+        masks = [LEFT_HAND if label == "Left" else RIGHT_HAND for label in self.hands.labels]
+        # a left and a right hand doing the same gesture count as a two-hand gesture, same as without hand IDs
+        both = ""
+        paired = set()
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                if masks[i] != masks[j] and gestures_list[i] == gestures_list[j]:
+                    both = gestures_list[i]
+                    paired.update((i, j))
+        for i, (hand_id, gesture, mask) in enumerate(zip(ids, gestures_list, masks)):
+            tracker = self._hand_trackers.get(hand_id)
+            if tracker is None:
+                tracker = self._hand_trackers[hand_id] = self.tracker.empty_copy()
+            elif self._hand_masks[hand_id] != mask:
+                # the hand's left/right vote flipped, so its history was recorded under the wrong hand
+                tracker.clear_queue()
+                self.matcher.reset(tracker)
+            self._hand_masks[hand_id] = mask
+            # a paired hand's gesture only goes to the two-hand tracker, so it can't also fire EITHER_HAND bindings.
+            # its own tracker still moves on, so the gesture starts over if the other hand lets go
+            tracker.append("" if i in paired else gesture, mask, timestamp_ms)
+        self.tracker.append(both, BOTH_HANDS, timestamp_ms)
+
+    def _track(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", timestamp_ms: int):
+        handedness_list = result.handedness
+        ids = self.hands.assign(result, timestamp_ms) if self.hands is not None else None
+        gestures_list = self._gestures(result, timestamp_ms, ids)
+        if ids is not None:
+            self._track_hands(result, timestamp_ms, ids, gestures_list)
+        # determine if there are multiple hands in the frame, and that they belong to the same person (left and right, and not two of the same hand)
+        elif len(handedness_list) > 1 and handedness_list[0][0].category_name != handedness_list[1][0].category_name:
+            gesture = gestures_list[0]
+            gesture_gesture = gestures_list[1]
+            hand = handedness_list[0][0].category_name
+            hand_hand = handedness_list[1][0].category_name
+            # are they doing the same gesture or do they need to be treated seperately>
+            if gesture == gesture_gesture:
+                self.tracker.append(gesture, BOTH_HANDS, timestamp_ms)
+            else:
+                self.tracker.append(
+                    gesture, 
+                    LEFT_HAND if hand == "Left" else RIGHT_HAND,
+                    timestamp_ms
+                )
+                self.tracker.append(
+                    gesture_gesture, 
+                    LEFT_HAND if hand_hand == "Left" else RIGHT_HAND,
+                    timestamp_ms
+                )
+        elif len(handedness_list) >= 1: # otherwise just grab the first single hand we indexed 
+            self.tracker.append(
+                gestures_list[0],
+                LEFT_HAND if handedness_list[0][0].category_name == "Left" else RIGHT_HAND,
+                timestamp_ms
+            )
+        else: # update GestureTracker with current timestamp
+            self.tracker.append("", BOTH_HANDS, timestamp_ms)
+        if self.motion is not None:
+            self._motion_match = self.motion.update(result, timestamp_ms, ids)
+
+    def _match(self, origin: float):
+        matched = self.tracker
+        name = self.matcher.match(self.tracker)
+        for tracker in self._hand_trackers.values():
+            if name is not None:
+                break
+            matched = tracker
+            name = self.matcher.match(tracker)
+        if name is None:
+            matched = None
+            name, self._motion_match = self._motion_match, None
+        if name is not None:
+            if self._info_msgs: print("[callback] Running action '%s'" % name)
+            # only the tracker that matched starts over- other hands keep their progress
+            if matched is not None:
+                matched.clear_queue()
+                self.matcher.reset(matched)
+            if self.motion is not None:
+                self.motion.reset()
+            if self.speculate is None:
+                self.executor.submit(name, origin)
+            else:
+                self.executor.commit(name, origin)
+        elif self.speculate is not None:
+            self._speculate(origin)
+        return name
+
+    def _confidence(self, gesture: str, hand_id: int = None) -> float:
+        """Lowest score of the hands showing gesture this frame, only looking at hand_id if given. 0 if none of them show it."""
+        scores = [score for score_id, score_gesture, score in self._scores if score_gesture == gesture and (hand_id is None or score_id == hand_id)]
+        return min(scores) if len(scores) > 0 else 0.0
+
+    def _speculate(self, origin: float):
+        """Arms the binding the held gestures are closest to finishing, or aborts whatever is armed if there is none."""
+        best = None
+        for hand_id, tracker in [(None, self.tracker)] + list(self._hand_trackers.items()):
+            predicted = self.matcher.predict(tracker)
+            if predicted is None or (best is not None and predicted[1] >= best[1]):
+                continue
+            if self._confidence(tracker.current().gesture, hand_id) >= self.speculate:
+                best = predicted
+        if best is None:
+            self.executor.abort()
+        else:
+            self.executor.arm(best[0], origin + best[1] / 1000)
+
+    def __call__(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", output_image: "mediapipe.Image", timestamp_ms: int):
+        with self._lock:
+            return self._handle(result, output_image, timestamp_ms)
+
+    def _handle(self, result: "mediapipe.tasks.vision.GestureRecognizerResult", output_image: "mediapipe.Image", timestamp_ms: int):
+        try: #idfk man
+            origin = entered = perf_counter()
+            if self.metrics is not None:
+                origin = self.metrics.frame_callback(timestamp_ms, entered)
+            self._track(result, timestamp_ms)
+            tracked = perf_counter()
+            self._match(origin)
+            if self.metrics is not None:
+                self.metrics.record("tracker", (tracked - entered) * 1000)
+                self.metrics.record("match", (perf_counter() - tracked) * 1000)
+            if self._annotate is not None and output_image is not None:
+                return self._annotate(output_image, result)
+        except Exception as e:
+            print(f"[callback] Error: ", end = "")
+            print(e, end = ". ")
+            print("Trace: " + traceback.format_exc())
+            if self._error_image is not None:
+                return self._error_image()
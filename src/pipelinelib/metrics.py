@@ -0,0 +1,253 @@
+# Module containing per-stage latency instrumentation and its exporters
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Callable, Dict
+import threading
+
+class LatencyHistogram(object):
+    """HDR-style histogram of latencies. Values are bucketed log-linearly- exact below 2^significant_bits microseconds,
+    and within 1 / 2^significant_bits relative error above that, so recording is O(1) and memory stays fixed.
+
+    Args:
+        significant_bits (int, optional): Sub-buckets per power of two, as a power of two. Defaults to 5 (~3% error).
+        max_ms (float, optional): Largest value tracked exactly, anything above is clamped into the last bucket. Defaults to 60000.
+    """
+
+    def __init__(self, significant_bits: int = 5, max_ms: float = 60000):
+        self._bits = significant_bits
+        self._sub = 1 << significant_bits
+        self._max_us = int(max_ms * 1000)
+        self._counts = [0] * (self._index(self._max_us) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def _index(self, value_us: int) -> int:
+        if value_us < self._sub:
+            return value_us
+        shift = value_us.bit_length() - self._bits - 1
+        return self._sub + shift * self._sub + ((value_us >> shift) - self._sub)
+
+    def _value(self, index: int) -> float:
+        """Midpoint of a bucket, in microseconds"""
+        if index < self._sub:
+            return index
+        shift, offset = divmod(index - self._sub, self._sub)
+        low = (self._sub + offset) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, value_ms: float):
+        value_us = min(max(int(value_ms * 1000), 0), self._max_us)
+        with self._lock:
+            self._counts[self._index(value_us)] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+            self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Returns the q-th quantile (0-1) in milliseconds, None when empty."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = max(1, int(q * self.count + 0.5))
+            seen = 0
+            for index, bucket in enumerate(self._counts):
+                seen += bucket
+                if seen >= target:
+                    return min(self._value(index) / 1000, self.max_ms)
+            return self.max_ms
+
+    def mean(self) -> float:
+        return None if self.count == 0 else self.total_ms / self.count
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.total_ms = 0.0
+            self.min_ms = None
+            self.max_ms = None
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "no samples"
+        return "p50 %7.2fms  p90 %7.2fms  p99 %7.2fms  max %7.2fms  (n=%d)" % (self.percentile(0.5), self.percentile(0.9), self.percentile(0.99), self.max_ms, self.count)
+
+    def __repr__(self):
+        return "<LatencyHistogram>%s" % self.summary()
+
+class PipelineMetrics(object):
+    """Latency histograms for every stage of the pipeline, from frame capture to the browser action finishing.
+    Frames are followed by the timestamp_ms they are submitted to the model with.
+
+    Stages:
+        capture: frame read by the capture thread -> submitted to recognize_async
+        inference: submitted -> result callback entered
+        tracker: GestureTracker update
+        match: GestureMatcher lookup
+        action: browser action run time
+        gesture_to_action: frame capture (or callback entry) -> browser action finished
+        first_frame: navigation click -> first frame of the new short painted, as measured in the page
+    """
+    STAGES = ["capture", "inference", "tracker", "match", "action", "gesture_to_action", "first_frame"]
+
+    def __init__(self, significant_bits: int = 5):
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram(significant_bits) for stage in self.STAGES}
+        self._frames = dict() # timestamp_ms -> (captured, submitted) perf_counter times, in submission order
+        self._frames_lock = threading.Lock()
+        self._stats_sources: Dict[str, Callable[[], dict]] = dict()
+
+    def record(self, stage: str, value_ms: float):
+        if stage not in self.stages:
+            self.stages[stage] = LatencyHistogram()
+        self.stages[stage].record(value_ms)
+
+    def frame_submitted(self, timestamp_ms: int, captured: float = None, submitted: float = None):
+        submitted = perf_counter() if submitted is None else submitted
+        if captured is not None:
+            self.record("capture", (submitted - captured) * 1000)
+        with self._frames_lock:
+            self._frames[timestamp_ms] = (captured, submitted)
+
+    def frame_callback(self, timestamp_ms: int, entered: float = None) -> float:
+        """Records the inference stage for a frame.
+
+        Returns:
+            float: perf_counter time the frame was captured, or the callback entry time if that is unknown.
+        """
+        entered = perf_counter() if entered is None else entered
+        with self._frames_lock:
+            trace = self._frames.pop(timestamp_ms, None)
+            # frames MediaPipe dropped never get a callback- forget anything submitted before this one
+            while len(self._frames) > 0:
+                oldest = next(iter(self._frames))
+                if oldest > timestamp_ms:
+                    break
+                del self._frames[oldest]
+        if trace is None:
+            return entered
+        captured, submitted = trace
+        self.record("inference", (entered - submitted) * 1000)
+        return entered if captured is None else captured
+
+    def action_complete(self, name: str, origin: float, started: float, finished: float):
+        """Matches ActionExecutor's on_complete hook."""
+        self.record("action", (finished - started) * 1000)
+        self.record("gesture_to_action", (finished - origin) * 1000)
+
+    def add_stats(self, name: str, stats: Callable[[], dict]):
+        """Exports a stats() method (FrameCapture, GestureModelWrapper, ActionExecutor, ...) next to the histograms."""
+        self._stats_sources[name] = stats
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: stats() for name, stats in self._stats_sources.items()}
+
+    def log_line(self) -> str:
+        parts = []
+        for stage, histogram in self.stages.items():
+            if histogram.count > 0:
+                parts.append("%s p50=%.1fms p99=%.1fms n=%d" % (stage, histogram.percentile(0.5), histogram.percentile(0.99), histogram.count))
+        for name, stats in self.stats().items():
+            parts.append("%s %s" % (name, str(stats)))
+        return " | ".join(parts) if len(parts) > 0 else "no samples"
+
+    def prometheus_text(self, prefix: str = "doomscroll") -> str:
+        lines = [
+            "# HELP %s_stage_latency_ms Pipeline stage latency in milliseconds" % prefix,
+            "# TYPE %s_stage_latency_ms summary" % prefix
+        ]
+        for stage, histogram in self.stages.items():
+            for q in (0.5, 0.9, 0.99):
+                value = histogram.percentile(q)
+                if value is not None:
+                    lines.append('%s_stage_latency_ms{stage="%s",quantile="%s"} %f' % (prefix, stage, q, value))
+            lines.append('%s_stage_latency_ms_sum{stage="%s"} %f' % (prefix, stage, histogram.total_ms))
+            lines.append('%s_stage_latency_ms_count{stage="%s"} %d' % (prefix, stage, histogram.count))
+        for name, stats in self.stats().items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)):
+                    series = "%s_%s_%s" % (prefix, name, key)
+                    lines.append("# TYPE %s gauge" % series)
+                    # bools are ints to isinstance, but prometheus only takes numbers as sample values
+                    lines.append("%s %s" % (series, int(value) if isinstance(value, bool) else value))
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self):
+        return "<PipelineMetrics>%s" % self.log_line()
+
+class MetricsLogger(object):
+    """Prints PipelineMetrics.log_line() every interval_s seconds on a background thread, prefixed with name if there is one."""
+
+    def __init__(self, metrics: PipelineMetrics, interval_s: float = 10, name: str = None):
+        self._metrics = metrics
+        self._interval = interval_s
+        self._name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._loop, name = "MetricsLogger", daemon = True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self._interval):
+            print("[metrics] %s" % self._metrics.log_line() if self._name is None else "[metrics] %s: %s" % (self._name, self._metrics.log_line()))
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout = 1)
+            self._thread = None
+
+class PrometheusExporter(object):
+    """Serves PipelineMetrics in the Prometheus text format on http://host:port/metrics.
+
+    Args:
+        metrics (PipelineMetrics): Metrics to export.
+        port (int): Port to listen on.
+        host (str, optional): Interface to bind. Defaults to "127.0.0.1".
+    """
+
+    def __init__(self, metrics: PipelineMetrics, port: int, host: str = "127.0.0.1"):
+        self._metrics = metrics
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter._metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                ... # keep scrapes out of the console
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._server.serve_forever, name = "PrometheusExporter", daemon = True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join(timeout = 1)
+            self._thread = None
+        self._server.server_close()
@@ -0,0 +1,83 @@
+# Module for recording recognizer results and replaying them without a camera or model
+from typing import Callable, Iterator, Tuple
+import mediapipe
+import json
+import threading
+
+Category = mediapipe.tasks.components.containers.Category
+NormalizedLandmark = mediapipe.tasks.components.containers.NormalizedLandmark
+Landmark = mediapipe.tasks.components.containers.Landmark
+GestureRecognizerResult = mediapipe.tasks.vision.GestureRecognizerResult
+
+def _category_to_list(category: Category) -> list:
+    return [category.index, category.score, category.display_name, category.category_name]
+
+def _category_from_list(dat: list) -> Category:
+    return Category(index = dat[0], score = dat[1], display_name = dat[2], category_name = dat[3])
+
+def result_to_dict(result: GestureRecognizerResult, timestamp_ms: int) -> dict:
+    """Serializes a recognizer result into plain JSON types."""
+    return {
+        "timestamp_ms": timestamp_ms,
+        "gestures": [[_category_to_list(c) for c in hand] for hand in result.gestures],
+        "handedness": [[_category_to_list(c) for c in hand] for hand in result.handedness],
+        "hand_landmarks": [[[lm.x, lm.y, lm.z] for lm in hand] for hand in result.hand_landmarks],
+        "hand_world_landmarks": [[[lm.x, lm.y, lm.z] for lm in hand] for hand in result.hand_world_landmarks]
+    }
+
+def result_from_dict(dat: dict) -> Tuple[GestureRecognizerResult, int]:
+    """Inverse of result_to_dict.
+
+    Returns:
+        Tuple[GestureRecognizerResult, int]: The result and its timestamp in milliseconds.
+    """
+    result = GestureRecognizerResult(
+        gestures = [[_category_from_list(c) for c in hand] for hand in dat["gestures"]],
+        handedness = [[_category_from_list(c) for c in hand] for hand in dat["handedness"]],
+        hand_landmarks = [[NormalizedLandmark(x = lm[0], y = lm[1], z = lm[2]) for lm in hand] for hand in dat["hand_landmarks"]],
+        hand_world_landmarks = [[Landmark(x = lm[0], y = lm[1], z = lm[2]) for lm in hand] for hand in dat.get("hand_world_landmarks", [])]
+    )
+    return result, dat["timestamp_ms"]
+
+def load_results(path: str) -> Iterator[Tuple[GestureRecognizerResult, int]]:
+    """Reads a file written by ResultRecorder, one (result, timestamp_ms) at a time."""
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield result_from_dict(json.loads(line))
+
+class ResultRecorder(object):
+    """Wraps a result callback and writes every result it sees to a JSON lines file, so the session can be replayed later.
+
+    Args:
+        path (str): File to write to. Overwritten if it exists.
+        result_callback (Callable[[GestureRecognizerResult, mediapipe.Image, int], Any]): Callback the results are forwarded to.
+
+    Returns:
+        ResultRecorder object, called with (result, output_image, timestamp_ms).
+    """
+
+    def __init__(self, path: str, result_callback: Callable):
+        self.path = path
+        self._file = open(path, "w")
+        self._lock = threading.Lock()
+        self._result_callback = result_callback
+        self.results_recorded = 0
+
+    def __call__(self, result: GestureRecognizerResult, output_image: "mediapipe.Image", timestamp_ms: int):
+        line = json.dumps(result_to_dict(result, timestamp_ms))
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self.results_recorded += 1
+        return self._result_callback(result, output_image, timestamp_ms)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,294 @@
+# Module containing the per-camera gesture session and the scheduler that shares inference between sessions
+import os
+import cv2
+from time import perf_counter
+from typing import Callable, Dict, List
+from mediapipelib.gesture_recognize import *
+from mediapipelib.gesture_pool import GesturePoolWrapper
+from mediapipelib.gesture_match import GestureMatcher
+from mediapipelib.hand_motion import MotionMatcher
+from mediapipelib.gesture_smoothing import GestureSmoother
+from mediapipelib.hand_identity import HandIdentityTracker
+from mediapipelib.hand_region import HandRegionTracker
+from webdriverlib.yt_browser import YTDriver, driver_actions, driver_batch, driver_prepare
+from webdriverlib.browser_backend import BrowserBackend, WebDriverBackend, CDPBackend
+from webdriverlib.action_queue import ActionExecutor
+from webdriverlib.liveness import LivenessMonitor
+from videolib.opencv_draw import annotate_image, black_image
+from videolib.frame_capture import FrameCapture
+from videolib.frame_buffers import BufferPool
+from videolib.motion_gate import MotionGate
+from videolib.frame_governor import FrameRateGovernor
+from pipelinelib.startup import StartupOrchestrator
+from pipelinelib.gesture_handler import GestureHandler
+from pipelinelib.replay import ResultRecorder
+from pipelinelib.metrics import PipelineMetrics
+
+class GestureSession(object):
+    """One camera -> recognizer -> tracker -> browser pipeline. Every session owns its own capture device, GestureModelWrapper,
+    GestureTracker, ActionExecutor and YTDriver, so several of them can run side by side in one process without sharing any state.
+
+    Args:
+        name (str): Name used in log lines, startup phases and the preview window.
+        camera (Union[int, str]): Capture device index or video file path.
+        config (module): Settings with the same names main.py uses (MODEL_PATH, MIN_GESTURE_MS, gestures, ...).
+        driver_factory (Callable[[], YTDriver], optional): Builds the session's browser. Defaults to a YTDriver on the configured BROWSER_BACKEND that reports first_frame latencies.
+        metrics (PipelineMetrics, optional): Where the session records latencies. Defaults to a PipelineMetrics of its own.
+        index (int, optional): Position among the sessions. Each one gets its own browser profile and debugging port from it. Defaults to 0.
+
+    Returns:
+        GestureSession object. Call start() to begin initializing, and wait() before stepping it.
+    """
+
+    def __init__(self, name: str, camera, config, driver_factory: Callable[[], YTDriver] = None, metrics: PipelineMetrics = None, index: int = 0):
+        self.name = name
+        self.index = index
+        self.camera = camera
+        self.config = config
+        self._driver_factory = self._build_driver if driver_factory is None else driver_factory
+        self.metrics = PipelineMetrics() if metrics is None else metrics
+        self.browser = None # set once the webdriver finishes starting up
+        self.liveness = None # watches the browser so alive() never has to ask it
+        self.recognizer = None
+        self.cap = None
+        self.governor = None
+        self._startup = None
+        # reused frame buffers- mediapipe.Image copies the RGB frame, so one conversion buffer is enough
+        self._rgb_pool = BufferPool(1)
+        self._display_pool = BufferPool(1)
+        self._preview_pool = BufferPool(config.PREVIEW_BUFFERS)
+        self.region_tracker = HandRegionTracker() if config.TRACK_HAND_REGION else None
+        if self.region_tracker is not None:
+            self.metrics.add_stats("region", self.region_tracker.stats)
+        self.motion_gate = MotionGate(config.MOTION_THRESHOLD, config.MOTION_MIN_CHANGED, keepalive_ms = config.MOTION_KEEPALIVE_MS) if config.MOTION_GATE else None
+        if self.motion_gate is not None:
+            self.metrics.add_stats("motion", self.motion_gate.stats)
+        # actions are buffered until the browser is up
+        self.executor = ActionExecutor(
+            driver_actions(lambda: self.browser),
+            config.ACTION_DEBOUNCE_MS,
+            ready = False,
+            on_complete = self.metrics.action_complete,
+            batch = driver_batch(lambda: self.browser) if config.BATCH_ACTIONS else None,
+            batch_actions = YTDriver.BATCH_ACTIONS,
+            # the batch script finds its elements in the page, so there is nothing to look up ahead of time when batching
+            prepare = driver_prepare(lambda: self.browser) if config.SPECULATE_MIN_SCORE is not None and not config.BATCH_ACTIONS else None
+        ).start()
+        self.metrics.add_stats("actions", self.executor.stats)
+        self.callback = GestureHandler(
+            GestureTracker(config.MIN_GESTURE_MS, config.GESTURE_HISTORY_LEN, config.GESTURE_HISTORY_AGE_MS),
+            GestureMatcher(config.gestures),
+            self.executor,
+            annotate = (lambda image, result: annotate_image(image, result, out = self._preview_pool.next(image.numpy_view().shape))) if config.SHOW_CAM else None,
+            error_image = lambda: black_image(500, 500, "Video stream error"),
+            info_msgs = config.INFO_MSGS,
+            metrics = self.metrics,
+            poses = config.poses,
+            motion = MotionMatcher(config.gestures),
+            smoother = GestureSmoother(config.SMOOTHING_TAU_MS) if config.SMOOTHING_TAU_MS is not None else None,
+            hands = HandIdentityTracker() if config.TRACK_HAND_IDS else None,
+            speculate = config.SPECULATE_MIN_SCORE
+        )
+        self.metrics.add_stats("motion_gestures", self.callback.motion.stats)
+        if self.callback.smoother is not None:
+            self.metrics.add_stats("smoothing", self.callback.smoother.stats)
+        if self.callback.hands is not None:
+            self.metrics.add_stats("hands", self.callback.hands.stats)
+        self.recorder = None
+        if config.RECORD_RESULTS_PATH is not None:
+            self.callback = self.recorder = ResultRecorder(config.RECORD_RESULTS_PATH % name if "%s" in config.RECORD_RESULTS_PATH else config.RECORD_RESULTS_PATH, self.callback)
+        self.frames_admitted = 0
+        self.frames_deferred = 0
+
+    def _log(self, message: str):
+        if self.config.INFO_MSGS: print("[%s] %s" % (self.name, message))
+
+    def _phase(self, phase: str) -> str:
+        return "%s.%s" % (self.name, phase)
+
+    def _browser_ready(self, driver: YTDriver):
+        self.browser = driver
+        if self.browser.is_running():
+            self.liveness = LivenessMonitor(driver, self.config.LIVENESS_INTERVAL_S).start()
+            self.metrics.add_stats("browser", self.liveness.stats)
+            self.executor.set_ready()
+        else:
+            print("[%s] Webdriver crashed- something went wrong with YTWrapper initialization." % self.name)
+
+    def _build_backend(self) -> BrowserBackend:
+        config = self.config
+        # browsers won't share a profile directory, so every session gets its own
+        profile = None if config.BROWSER_PROFILE_DIR is None else os.path.join(config.BROWSER_PROFILE_DIR, self.name)
+        if config.BROWSER_BACKEND == "cdp":
+            return CDPBackend(profile, config.CDP_PORT + self.index)
+        if config.BROWSER_BACKEND == "webdriver":
+            return WebDriverBackend(profile)
+        raise ValueError("%s is not a recognized browser backend" % str(config.BROWSER_BACKEND))
+
+    def _build_driver(self) -> YTDriver:
+        return YTDriver(left_monitor = True, prefetch = self.config.PREFETCH_SHORTS, on_first_frame = lambda ms: self.metrics.record("first_frame", ms), backend = self._build_backend())
+
+    def _build_recognizer(self) -> GestureModelWrapper:
+        config = self.config
+        if config.INFERENCE_WORKERS > 0:
+            return GesturePoolWrapper(config.MODEL_PATH, self.callback, workers = config.INFERENCE_WORKERS, output_images = config.SHOW_CAM, target_fps = config.TARGET_FPS, metrics = self.metrics, region_tracker = self.region_tracker, full_output = config.SHOW_CAM, num_hands = config.NUM_HANDS)
+        return GestureModelWrapper(config.MODEL_PATH, self.callback, submit_policy = config.SUBMIT_POLICY, max_in_flight = config.MAX_IN_FLIGHT, target_fps = config.TARGET_FPS, metrics = self.metrics, region_tracker = self.region_tracker, full_output = config.SHOW_CAM, num_hands = config.NUM_HANDS)
+
+    def start(self, startup: StartupOrchestrator):
+        """Adds the session's browser, model and camera phases to a (possibly shared) StartupOrchestrator."""
+        self._startup = startup
+        self._log("Initalizaing Webdriver, Gesture Recognizer and video capture device")
+        startup.add(self._phase("browser"), self._driver_factory, on_ready = self._browser_ready)
+        startup.add(self._phase("model"), self._build_recognizer)
+        startup.add(self._phase("camera"), lambda: FrameCapture(self.camera, self.config.FRAME_BUFFER_SIZE).start())
+        return self
+
+    def wait(self):
+        """Blocks until the model and camera are up. Re-raises if either failed."""
+        self.recognizer = self._startup.wait(self._phase("model"))
+        self.cap = self._startup.wait(self._phase("camera"))
+        self.metrics.add_stats("recognizer", self.recognizer.stats)
+        self.metrics.add_stats("frames", self.cap.stats)
+        if self.config.LATENCY_BUDGET_MS is not None:
+            self.governor = FrameRateGovernor(self.cap, self.recognizer, self.config.LATENCY_BUDGET_MS, info_msgs = self.config.INFO_MSGS)
+            self.metrics.add_stats("governor", self.governor.stats)
+        return self
+
+    def alive(self) -> bool:
+        """False once the camera runs out or the browser goes away. Still True while the browser is starting up.
+        Only reads flags, the browser itself is checked by the LivenessMonitor."""
+        if self.cap is None or not self.cap.is_opened():
+            return False
+        if not self._startup.done(self._phase("browser")):
+            return True
+        return self.liveness is not None and self.liveness.alive
+
+    def step(self, scheduler: "SessionScheduler" = None, timeout: float = None) -> bool:
+        """Reads the newest frame and hands it to the model, if the motion gate and the scheduler let it through.
+
+        Args:
+            scheduler (SessionScheduler, optional): Shares inference between sessions. Every frame is admitted when None. Defaults to None.
+            timeout (float, optional): Seconds to wait for a frame. Defaults to FRAME_TIMEOUT_S.
+
+        Returns:
+            bool: True if a frame was read.
+        """
+        ok, frame = self.cap.read(self.config.FRAME_TIMEOUT_S if timeout is None else timeout)
+        if self.governor is not None:
+            self.governor.update()
+        if not ok:
+            return False
+        if self.motion_gate is not None and not self.motion_gate.check(frame, self.recognizer.hands_present):
+            self.recognizer.tick() # nothing moved- skip the model, but keep the tracker's clock running
+        elif scheduler is not None and not scheduler.admit(self):
+            self.frames_deferred += 1
+            self.recognizer.tick() # another session needs the cpu more
+        else:
+            self.frames_admitted += 1
+            img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst = self._rgb_pool.next(frame.shape))
+            self.recognizer.process_frame(img, self.cap.frame_time)
+        return True
+
+    def show_preview(self, window: str):
+        if self.config.SHOW_CAM and self.recognizer is not None and self.recognizer.last_callback_result is not None:
+            preview = self.recognizer.last_callback_result
+            cv2.imshow(window, cv2.cvtColor(preview, cv2.COLOR_RGB2BGR, dst = self._display_pool.next(preview.shape)))
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.frames_admitted,
+            "deferred": self.frames_deferred,
+            "hands": self.recognizer is not None and self.recognizer.hands_present
+        }
+
+    def close(self):
+        """Stops everything the session owns. Anything that finished starting after the main loop bailed out gets picked up and closed too."""
+        self.executor.close(timeout = 5)
+        if self._startup is not None:
+            self._startup.wait_all() # don't leave a browser starting up in the background
+            if self.recognizer is None and not self._startup.failed(self._phase("model")): self.recognizer = self._startup.wait(self._phase("model"))
+            if self.cap is None and not self._startup.failed(self._phase("camera")): self.cap = self._startup.wait(self._phase("camera"))
+        self._log("Action stats: %s" % str(self.executor.stats()))
+        if self.liveness is not None:
+            self.liveness.close()
+        if self.browser is not None and self.browser.is_running(): self.browser.close()
+        if self.cap is not None:
+            self.cap.release()
+            self._log("Frame stats: %s" % str(self.cap.stats()))
+        if self.recognizer is not None:
+            self._log("Recognizer stats: %s" % str(self.recognizer.stats()))
+            self.recognizer.close()
+        self._log("Metrics: %s" % self.metrics.log_line())
+        if self.recorder is not None:
+            self._log("Recorded %d results to %s" % (self.recorder.results_recorded, self.recorder.path))
+            self.recorder.close()
+
+    def __repr__(self):
+        return "<GestureSession %s>%s" % (self.name, str(self.stats()))
+
+class SessionScheduler(object):
+    """Shares a CPU budget for inference between sessions. Each session earns credit at its share of the budget,
+    and a frame is only admitted once the session has enough credit to pay for it, using the recognizer's round trip as the cost.
+    Sessions with hands in view get a bigger share, so an active station stays responsive while idle ones slow down.
+
+    Args:
+        budget_ms (float, optional): Milliseconds of inference per second to share out. Defaults to 1000 per core, leaving one core for everything else.
+        active_weight (float, optional): Share of a session with hands in view, relative to an idle one. Defaults to 4.
+        burst (float, optional): Frames worth of credit a session can save up. Defaults to 2.
+        default_cost_ms (float, optional): Cost assumed before a session's first round trip is known. Defaults to 30.
+
+    Returns:
+        SessionScheduler object.
+    """
+
+    def __init__(self, budget_ms: float = None, active_weight: float = 4, burst: float = 2, default_cost_ms: float = 30):
+        self.budget_ms = 1000 * max(1, (os.cpu_count() or 2) - 1) if budget_ms is None else budget_ms
+        self.active_weight = active_weight
+        self.burst = burst
+        self.default_cost_ms = default_cost_ms
+        self.sessions: List[GestureSession] = []
+        self._credit: Dict[GestureSession, float] = dict()
+        self._last_update: Dict[GestureSession, float] = dict()
+        self.frames_admitted = 0
+        self.frames_deferred = 0
+
+    def add(self, session: GestureSession):
+        self.sessions.append(session)
+        self._credit[session] = 0.0
+        self._last_update[session] = None
+        return session
+
+    def _weight(self, session: GestureSession) -> float:
+        return self.active_weight if session.recognizer is not None and session.recognizer.hands_present else 1
+
+    def share_ms(self, session: GestureSession) -> float:
+        """Milliseconds of inference per second the session is currently entitled to."""
+        total = sum(self._weight(other) for other in self.sessions)
+        return self.budget_ms * self._weight(session) / total if total > 0 else self.budget_ms
+
+    def admit(self, session: GestureSession, now: float = None) -> bool:
+        """Decides whether the session gets to run the model on its current frame, and charges it if so."""
+        now = perf_counter() if now is None else now
+        cost = session.recognizer.round_trip_ms or self.default_cost_ms
+        last = self._last_update[session]
+        # the first frame is always free
+        credit = cost if last is None else self._credit[session] + self.share_ms(session) * (now - last)
+        credit = min(credit, cost * self.burst)
+        self._last_update[session] = now
+        if credit < cost:
+            self._credit[session] = credit
+            self.frames_deferred += 1
+            return False
+        self._credit[session] = credit - cost
+        self.frames_admitted += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "admitted": self.frames_admitted,
+            "deferred": self.frames_deferred
+        }
+
+    def __repr__(self):
+        return "<SessionScheduler>%s" % str(self.stats())
@@ -0,0 +1,88 @@
+# Module containing the concurrent startup orchestrator
+from concurrent.futures import ThreadPoolExecutor, Future
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+class StartupOrchestrator(object):
+    """Runs slow initialization phases (webdriver, camera, model, ...) concurrently and times each of them.
+    Phases start as soon as they are added, callers only block on the phases they actually need.
+
+    Args:
+        info_msgs (bool, optional): Print a line as each phase finishes. Defaults to True.
+        max_workers (int, optional): Maximum number of phases initializing at once. Defaults to 4.
+
+    Returns:
+        StartupOrchestrator object.
+    """
+
+    def __init__(self, info_msgs: bool = True, max_workers: int = 4):
+        self._info_msgs = info_msgs
+        self._pool = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = "Startup")
+        self._phases: Dict[str, Future] = dict()
+        self._start_time = perf_counter()
+        self.timings: Dict[str, float] = dict() # phase name -> milliseconds it took
+
+    def add(self, name: str, init: Callable[[], Any], on_ready: Callable[[Any], None] = None) -> Future:
+        """Starts a phase on a worker thread.
+
+        Args:
+            name (str): Name of the phase.
+            init (Callable[[], Any]): Builds and returns the subsystem.
+            on_ready (Callable[[Any], None], optional): Called with the result of init once it succeeds, on the worker thread. Defaults to None.
+
+        Raises:
+            ValueError: If a phase with the same name was already added.
+        """
+        if name in self._phases:
+            raise ValueError("Startup phase '%s' already exists" % name)
+        self._phases[name] = self._pool.submit(self._run_phase, name, init, on_ready)
+        return self._phases[name]
+
+    def _run_phase(self, name: str, init: Callable[[], Any], on_ready: Callable[[Any], None]):
+        start = perf_counter()
+        try:
+            result = init()
+        except Exception as e:
+            self.timings[name] = (perf_counter() - start) * 1000
+            print("[startup] Error: phase '%s' failed after %dms. " % (name, self.timings[name]), end = "")
+            print(e)
+            raise
+        self.timings[name] = (perf_counter() - start) * 1000
+        if self._info_msgs: print("[startup] '%s' ready in %dms" % (name, self.timings[name]))
+        if on_ready is not None:
+            on_ready(result)
+        return result
+
+    def wait(self, name: str, timeout: float = None) -> Any:
+        """Blocks until a phase is done and returns its result. Re-raises the exception if the phase failed."""
+        return self._phases[name].result(timeout)
+
+    def done(self, name: str) -> bool:
+        return self._phases[name].done()
+
+    def failed(self, name: str) -> bool:
+        return self._phases[name].done() and self._phases[name].exception() is not None
+
+    def wait_all(self):
+        for future in self._phases.values():
+            try:
+                future.result()
+            except Exception:
+                ... # already reported by the phase itself
+
+    def report(self) -> str:
+        phases = ", ".join("%s: %dms" % (name, ms) for name, ms in self.timings.items())
+        return "%s (%dms since start)" % (phases, (perf_counter() - self._start_time) * 1000)
+
+    def close(self):
+        self.wait_all()
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<StartupOrchestrator>{'phases': %s, 'timings': %s}" % (str(list(self._phases.keys())), str(self.timings))
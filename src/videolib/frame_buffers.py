@@ -0,0 +1,28 @@
+# Module containing reusable frame buffers, so the frame path does not allocate in steady state
+import numpy as np
+
+class BufferPool(object):
+    """Fixed ring of reusable numpy arrays. Buffers are only reallocated when the requested shape changes.
+    A buffer handed out by next() gets handed out again count calls later, so count has to cover every buffer still in use at once.
+
+    Args:
+        count (int, optional): Number of buffers in the ring. Defaults to 1.
+        dtype (numpy.dtype, optional): Element type of the buffers. Defaults to numpy.uint8.
+    """
+
+    def __init__(self, count: int = 1, dtype = np.uint8):
+        self._buffers = [None] * count
+        self._dtype = dtype
+        self._index = 0
+        self.allocations = 0
+
+    def next(self, shape: tuple) -> np.ndarray:
+        buffer = self._buffers[self._index]
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[self._index] = np.empty(shape, dtype = self._dtype)
+            self.allocations += 1
+        self._index = (self._index + 1) % len(self._buffers)
+        return buffer
+
+    def __repr__(self):
+        return "<BufferPool>{'count': %d, 'allocations': %d}" % (len(self._buffers), self.allocations)
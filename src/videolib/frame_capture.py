@@ -0,0 +1,133 @@
+# Module containing the threaded capture stage for OpenCV video devices
+import cv2
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Union
+
+class FrameCapture(object):
+    """Reads frames from an OpenCV capture device on a dedicated thread.
+    Frames are pushed into a fixed-size ring buffer, and once the buffer is full the oldest frame gets dropped.
+    Consumers always get the newest frame, so a slow consumer never makes the camera fall behind.
+    Frames are read into a fixed set of reused buffers, so a frame returned by read() is only valid until the next read() call.
+
+    Args:
+        source (Union[int, str]): Capture device index or video file path, passed straight to cv2.VideoCapture.
+        buffer_size (int, optional): Number of frames the ring buffer holds. Defaults to 2.
+
+    Returns:
+        FrameCapture object. Call start() before reading frames.
+    """
+
+    def __init__(self, source: Union[int, str], buffer_size: int = 2):
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # stop the driver from queueing stale frames on its end too. not every backend supports this
+        self._buffer = deque([], maxlen = buffer_size)
+        self._free = [] # buffers that can be read into again
+        self._held = None # buffer last handed out by read()
+        self._new_frame = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.frame_time = None # perf_counter time the last frame returned by read() was captured
+        self._requested_format = None # (width, height, fps) to apply on the capture thread before its next read
+
+    def start(self):
+        if self._thread is None and self.cap.isOpened():
+            self._running = True
+            self._thread = threading.Thread(target = self._capture_loop, name = "FrameCapture", daemon = True)
+            self._thread.start()
+        return self
+
+    def request_format(self, width: int = None, height: int = None, fps: float = None):
+        """Asks the device for a new frame size and/or rate. Applied by the capture thread between reads, since
+        changing properties while another thread is inside cap.read() is not safe on every backend. None leaves a property as it is."""
+        with self._new_frame:
+            self._requested_format = (width, height, fps)
+
+    def _apply_format(self, width: int, height: int, fps: float):
+        if width is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps is not None:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        # drivers round to whatever modes they support, and the buffers get reallocated to the new size on their own
+        self._free.clear()
+
+    def format(self) -> tuple:
+        """Returns the (width, height, fps) the device reports."""
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), self.cap.get(cv2.CAP_PROP_FPS))
+
+    def _capture_loop(self):
+        while self._running:
+            with self._new_frame:
+                requested, self._requested_format = self._requested_format, None
+                if requested is not None:
+                    self._apply_format(*requested)
+                reuse = self._free.pop() if len(self._free) > 0 else None
+            # the first few reads allocate, after that every frame lands in a recycled buffer
+            ok, frame = self.cap.read() if reuse is None else self.cap.read(reuse)
+            with self._new_frame:
+                if not ok:
+                    # device closed or end of file- nothing else is coming
+                    self._running = False
+                else:
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.frames_dropped += 1
+                        self._free.append(self._buffer.popleft()[0])
+                    self._buffer.append((frame, perf_counter()))
+                    self.frames_captured += 1
+                self._new_frame.notify_all()
+
+    def read(self, timeout: float = None):
+        """Waits for a frame and returns the newest one. Any older frames still in the buffer are dropped.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a new frame. Waits forever when None. Defaults to None.
+
+        Returns:
+            Tuple[bool, numpy.ndarray]: Same shape as cv2.VideoCapture.read, (False, None) if no frame arrived in time.
+        """
+        with self._new_frame:
+            if len(self._buffer) == 0:
+                self._new_frame.wait_for(lambda: len(self._buffer) > 0 or not self._running, timeout)
+            if len(self._buffer) == 0:
+                return False, None
+            frame, self.frame_time = self._buffer.pop()
+            self.frames_dropped += len(self._buffer)
+            while len(self._buffer) > 0:
+                self._free.append(self._buffer.popleft()[0])
+            if self._held is not None:
+                self._free.append(self._held)
+            self._held = frame
+            self.frames_processed += 1
+        return True, frame
+
+    def is_opened(self) -> bool:
+        return self._running or len(self._buffer) > 0
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.frames_captured,
+            "dropped": self.frames_dropped,
+            "processed": self.frames_processed
+        }
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout = 1)
+            self._thread = None
+        self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.release()
+
+    def __repr__(self):
+        return "<FrameCapture>%s" % str(self.stats())
@@ -0,0 +1,105 @@
+# Module containing the governor that trades capture quality for inference latency
+from typing import List, Tuple
+from time import perf_counter
+
+class FrameRateGovernor(object):
+    """Watches the recognizer's round-trip time (recognize_async -> result callback) and steps the capture device and submission rate
+    up or down a ladder of profiles to keep it inside a latency budget. Every change is logged.
+
+    Args:
+        capture (FrameCapture): Capture stage to reconfigure.
+        recognizer (GestureModelWrapper): Recognizer whose round trip is measured, and whose max_fps gets capped.
+        target_ms (float, optional): Round-trip latency budget. Defaults to 60.
+        profiles (List[Tuple[int, int, float]], optional): (width, height, fps) from best to cheapest. Defaults to PROFILES.
+        start (int, optional): Index of the profile to start on, applied straight away. Defaults to None, which leaves the device's own format alone
+            and starts on the profile closest to it. The governor then never steps above that profile, so it only ever changes the format to get under the budget.
+        interval_ms (int, optional): Time between decisions. Defaults to 2000.
+        headroom (float, optional): Only step back up when the round trip is under target_ms * headroom. Defaults to 0.6.
+        info_msgs (bool, optional): Print each decision. Defaults to True.
+
+    Returns:
+        FrameRateGovernor object. Call update() once per frame from the capture loop.
+    """
+    PROFILES = [
+        (1280, 720, 30),
+        (960, 540, 30),
+        (640, 480, 30),
+        (640, 480, 20),
+        (480, 360, 15),
+        (320, 240, 10)
+    ]
+
+    def __init__(self, capture, recognizer, target_ms: float = 60, profiles: List[Tuple[int, int, float]] = None, start: int = None, interval_ms: int = 2000, headroom: float = 0.6, info_msgs: bool = True):
+        self._capture = capture
+        self._recognizer = recognizer
+        self.target_ms = target_ms
+        self.profiles = self.PROFILES if profiles is None else profiles
+        self.interval_ms = interval_ms
+        self.headroom = headroom
+        self._info_msgs = info_msgs
+        self._last_decision = perf_counter() * 1000
+        self._last_completed = 0
+        self.level = None
+        self.decisions = []  # (perf_counter ms, round trip ms, profile index)
+        self._native = None # device's own format, restored instead of the closest profile when stepping back up to it
+        self.format = None # (width, height, fps) the device was last left on
+        if start is None:
+            self.format = capture.format()
+            # some devices report 0 for what they don't know- only a fully reported format is worth restoring
+            if all(value > 0 for value in self.format):
+                self._native = self.format
+            self._top = self.level = self._closest(self.format)
+            self.decisions.append((perf_counter() * 1000, None, self.level))
+            if self._info_msgs:
+                print("[governor] starting- keeping the camera's %dx%d@%gfps" % self.format)
+        else:
+            self._top = 0
+            self._apply(start, None)
+
+    def _closest(self, current: Tuple[int, int, float]) -> int:
+        """Index of the profile nearest to a (width, height, fps) format, by pixel count first, then frame rate. 0 if the device doesn't report its size."""
+        width, height, fps = current
+        if width <= 0 or height <= 0:
+            return 0
+        pixels = width * height
+        # an unreported frame rate ties every rate at that size, so the best one wins
+        return min(range(len(self.profiles)), key = lambda i: (abs(self.profiles[i][0] * self.profiles[i][1] - pixels), abs(self.profiles[i][2] - fps) if fps > 0 else 0))
+
+    def _apply(self, level: int, round_trip_ms: float):
+        self.level = level
+        width, height, fps = self._native if level == self._top and self._native is not None else self.profiles[level]
+        self._capture.request_format(width, height, fps)
+        self._recognizer.max_fps = fps if fps > 0 else None
+        self.format = (width, height, fps)
+        self.decisions.append((perf_counter() * 1000, round_trip_ms, level))
+        if self._info_msgs:
+            reason = "starting" if round_trip_ms is None else "round trip %.1fms, budget %.1fms" % (round_trip_ms, self.target_ms)
+            print("[governor] %s- capturing at %dx%d@%gfps" % (reason, width, height, fps))
+
+    def update(self, now_ms: float = None):
+        """Makes a decision if one is due. Cheap to call every frame."""
+        now_ms = perf_counter() * 1000 if now_ms is None else now_ms
+        round_trip = self._recognizer.round_trip_ms
+        if now_ms - self._last_decision < self.interval_ms or round_trip is None:
+            return
+        self._last_decision = now_ms
+        if self._recognizer.frames_completed == self._last_completed:
+            return # no new results (e.g. the motion gate is closed)- the average is stale
+        self._last_completed = self._recognizer.frames_completed
+        if round_trip > self.target_ms and self.level < len(self.profiles) - 1:
+            self._apply(self.level + 1, round_trip)
+        elif round_trip < self.target_ms * self.headroom and self.level > self._top:
+            self._apply(self.level - 1, round_trip)
+
+    def stats(self) -> dict:
+        width, height, fps = self.format
+        return {
+            "level": self.level,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "changes": len(self.decisions) - 1
+        }
+
+    def __repr__(self):
+        return "<FrameRateGovernor>%s" % str(self.stats())
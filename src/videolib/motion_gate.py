@@ -0,0 +1,97 @@
+# Module containing the motion pre-filter that keeps static frames away from the recognizer
+import cv2
+import numpy as np
+from time import perf_counter
+
+class MotionGate(object):
+    """Cheap frame differencing on a small grayscale copy of each frame. Frames only go through to the recognizer when something moved,
+    while hands are in view, or at a low keep-alive rate so a hand that appears without much motion still gets picked up.
+
+    Args:
+        threshold (int, optional): Grayscale difference (0-255) for a pixel to count as changed. Defaults to 25.
+        min_changed (float, optional): Fraction of changed pixels that counts as motion. Defaults to 0.01.
+        size (int, optional): Longest side in pixels of the downsampled frame that gets compared. Defaults to 64.
+        hold_ms (int, optional): How long the gate stays open after motion or hands were last seen. Defaults to 1500.
+        keepalive_ms (int, optional): Let one frame through at least this often, even when nothing moves. Defaults to 1000.
+
+    Returns:
+        MotionGate object.
+    """
+
+    def __init__(self, threshold: int = 25, min_changed: float = 0.01, size: int = 64, hold_ms: int = 1500, keepalive_ms: int = 1000):
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.size = size
+        self.hold_ms = hold_ms
+        self.keepalive_ms = keepalive_ms
+        self._frame_shape = None
+        self._small = None
+        self._gray = None
+        self._previous = None
+        self._diff = None
+        self._open_until = -1
+        self._last_passed = None
+        self.frames_passed = 0
+        self.frames_gated = 0
+        self.keepalives = 0
+
+    def _allocate(self, frame_height: int, frame_width: int):
+        scale = self.size / max(frame_height, frame_width)
+        shape = (max(1, int(frame_height * scale)), max(1, int(frame_width * scale)))
+        self._small = np.empty(shape + (3,), dtype = np.uint8)
+        self._gray = np.empty(shape, dtype = np.uint8)
+        self._previous = None
+        self._diff = np.empty(shape, dtype = np.uint8)
+
+    def motion(self, bgr_frame: np.ndarray) -> bool:
+        """Compares the frame against the previous one. Always True for the first frame."""
+        frame_height, frame_width = bgr_frame.shape[:2]
+        if self._frame_shape != (frame_height, frame_width):
+            self._frame_shape = (frame_height, frame_width)
+            self._allocate(frame_height, frame_width)
+        cv2.resize(bgr_frame, (self._small.shape[1], self._small.shape[0]), dst = self._small, interpolation = cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst = self._gray)
+        if self._previous is None:
+            self._previous = np.empty_like(self._gray)
+            moved = True
+        else:
+            cv2.absdiff(self._gray, self._previous, dst = self._diff)
+            cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst = self._diff)
+            moved = cv2.countNonZero(self._diff) >= self.min_changed * self._diff.size
+        self._gray, self._previous = self._previous, self._gray
+        return moved
+
+    def check(self, bgr_frame: np.ndarray, hands_present: bool = False, now_ms: float = None) -> bool:
+        """Decides whether a frame should go through to the recognizer.
+
+        Args:
+            bgr_frame (numpy.ndarray): Frame straight from the capture device.
+            hands_present (bool, optional): Whether the last result had hands in it- keeps the gate open while a gesture is held still. Defaults to False.
+            now_ms (float, optional): Current time in milliseconds. Defaults to perf_counter.
+
+        Returns:
+            bool: True if the frame should be submitted.
+        """
+        now_ms = perf_counter() * 1000 if now_ms is None else now_ms
+        if self.motion(bgr_frame) or hands_present:
+            self._open_until = now_ms + self.hold_ms
+        if now_ms < self._open_until:
+            self.frames_passed += 1
+        elif self._last_passed is None or now_ms - self._last_passed >= self.keepalive_ms:
+            self.keepalives += 1
+            self.frames_passed += 1
+        else:
+            self.frames_gated += 1
+            return False
+        self._last_passed = now_ms
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "passed": self.frames_passed,
+            "gated": self.frames_gated,
+            "keepalives": self.keepalives
+        }
+
+    def __repr__(self):
+        return "<MotionGate>%s" % str(self.stats())
@@ -4,11 +4,16 @@ import numpy as np
 import cv2
 
 # mostly for testing, but will add this as an optional feature in prod?
-def annotate_image(image: Image, detection_result: "mediapipe.tasks.vision.GestureRecognizerResult", font_color: tuple = (88, 205, 54)):
+def annotate_image(image: Image, detection_result: "mediapipe.tasks.vision.GestureRecognizerResult", font_color: tuple = (88, 205, 54), out: np.ndarray = None):
+    """Draws landmarks and gesture labels onto a copy of the image. Pass a buffer with the image's shape as out to skip allocating the copy."""
     hand_landmarks_list = detection_result.hand_landmarks
     handedness_list = detection_result.handedness
     gestures_list = detection_result.gestures
-    annotated_image = np.copy(image.numpy_view())
+    if out is None:
+        annotated_image = np.copy(image.numpy_view())
+    else:
+        annotated_image = out
+        np.copyto(annotated_image, image.numpy_view())
     # Loop through the detected hands to visualize.
     for idx in range(len(hand_landmarks_list)):
         hand_landmarks = hand_landmarks_list[idx]
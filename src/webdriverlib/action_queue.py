@@ -0,0 +1,275 @@
+# Module containing the queued executor for browser actions
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Callable, Collection, Dict, List, Union
+
+class ActionExecutor(object):
+    """Runs named actions one at a time on a worker thread, so slow browser calls never block the caller.
+    Submitting an action that is already waiting in the queue coalesces into the queued one, i.e. three queued "next" actions run once.
+    An action can also be armed ahead of time, when it is about to be triggered: the worker prepares it straight away and runs it on its own at the armed time,
+    unless it is aborted first. commit() then confirms it (or runs it, if it hasn't fired yet) when the trigger actually happens.
+
+    Args:
+        actions (Dict[str, Callable[[], Any]]): Action names mapped to the callables that run them.
+        debounce_ms (Union[int, Dict[str, int]], optional): Minimum time between two runs of the same action, either for every action or per action name. Submissions inside the window are dropped. Defaults to 0.
+        ready (bool, optional): Whether actions can run right away. When False, actions are buffered until set_ready() is called, e.g. while the browser is still starting. Defaults to True.
+        on_complete (Callable[[str, float, float, float], None], optional): Called on the worker thread after each action with (name, origin, started, finished) perf_counter times. Defaults to None.
+        batch (Callable[[List[str]], Any], optional): Runs several actions in one call. When set, consecutive pending actions in batch_actions are drained and handed to it together, in submission order. Defaults to None.
+        batch_actions (Collection[str], optional): Action names batch can run. Anything else runs on its own. Defaults to None.
+        prepare (Callable[[str], Any], optional): Called on the worker thread with the name of an armed action, before it runs, e.g. to look up what it will click. Defaults to None.
+
+    Returns:
+        ActionExecutor object. Call start() before submitting actions.
+    """
+
+    def __init__(self, actions: Dict[str, Callable], debounce_ms: Union[int, Dict[str, int]] = 0, ready: bool = True, on_complete: Callable[[str, float, float, float], None] = None, batch: Callable[[List[str]], None] = None, batch_actions: Collection[str] = None, prepare: Callable[[str], None] = None):
+        self._actions = actions
+        self._prepare = prepare
+        self._on_complete = on_complete
+        self._batch = batch
+        self._batch_actions = set() if batch is None or batch_actions is None else set(batch_actions)
+        self._debounce = debounce_ms
+        self._ready = ready
+        self._pending = deque()
+        self._origins = dict() # pending action name -> perf_counter time of whatever triggered it
+        self._last_run = dict() # action name -> perf_counter time it last started
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._armed = None # name of the action armed to run at _armed_at
+        self._armed_at = 0.0
+        self._armed_prepared = False
+        self._fired = None # armed action that already ran and is waiting for commit() or abort()
+        self.current_actions = [] # names of the action or batch running right now
+        self.actions_submitted = 0
+        self.actions_coalesced = 0
+        self.actions_debounced = 0
+        self.actions_run = 0
+        self.batches_run = 0
+        self.actions_armed = 0
+        self.actions_fired_early = 0
+        self.actions_committed = 0 # armed actions whose trigger did happen
+        self.actions_aborted = 0 # armed actions cancelled before they ran
+        self.actions_mispredicted = 0 # armed actions that ran, but whose trigger never happened
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target = self._worker, name = "ActionExecutor", daemon = True)
+            self._thread.start()
+        return self
+
+    def set_ready(self):
+        """Lets buffered actions run."""
+        with self._cond:
+            self._ready = True
+            self._cond.notify_all()
+
+    def _debounce_ms(self, name: str) -> int:
+        if isinstance(self._debounce, dict):
+            return self._debounce.get(name, 0)
+        return self._debounce
+
+    def submit(self, name: str, origin: float = None) -> bool:
+        """Queues an action to run on the worker thread.
+
+        Args:
+            name (str): Name of the action.
+            origin (float, optional): perf_counter time of the event that triggered the action, for latency reporting. Defaults to the time of submission.
+
+        Raises:
+            ValueError: If the action name is not recognized.
+
+        Returns:
+            bool: True if the action was queued, False if it was coalesced or debounced.
+        """
+        if name not in self._actions:
+            raise ValueError("%s is not a recognized action" % name)
+        with self._cond:
+            return self._enqueue(name, origin)
+
+    def _enqueue(self, name: str, origin: float = None) -> bool:
+        """submit() without the name check. Must hold _cond."""
+        self.actions_submitted += 1
+        if name in self._pending or name in self.current_actions:
+            self.actions_coalesced += 1
+            return False
+        last_run = self._last_run.get(name)
+        if last_run is not None and (perf_counter() - last_run) * 1000 < self._debounce_ms(name):
+            self.actions_debounced += 1
+            return False
+        self._pending.append(name)
+        self._origins[name] = perf_counter() if origin is None else origin
+        self._cond.notify_all()
+        return True
+
+    def arm(self, name: str, fire_at: float) -> bool:
+        """Schedules an action that is expected to be triggered at fire_at. It is prepared right away, and runs at fire_at unless abort() is called first.
+        Arming the same action again only moves fire_at. Only one action can be armed at a time- arming another one aborts the current one.
+
+        Args:
+            name (str): Name of the action.
+            fire_at (float): perf_counter time to run it at. Also used as its origin for latency reporting.
+
+        Raises:
+            ValueError: If the action name is not recognized.
+
+        Returns:
+            bool: False if the action already fired early and is waiting for commit().
+        """
+        if name not in self._actions:
+            raise ValueError("%s is not a recognized action" % name)
+        with self._cond:
+            if self._fired == name:
+                return False
+            if self._armed != name:
+                if self._armed is not None:
+                    self.actions_aborted += 1
+                self._armed = name
+                self._armed_prepared = self._prepare is None
+                self.actions_armed += 1
+            self._armed_at = fire_at
+            self._cond.notify_all()
+            return True
+
+    def abort(self):
+        """Cancels the armed action. If it already fired early, it is counted as mispredicted- a browser action can't be taken back."""
+        with self._cond:
+            if self._armed is not None:
+                self.actions_aborted += 1
+                self._armed = None
+            if self._fired is not None:
+                self.actions_mispredicted += 1
+                self._fired = None
+
+    def commit(self, name: str, origin: float = None) -> bool:
+        """Like submit(), for when the action's trigger actually happened. An armed action that already fired early isn't run again,
+        and one that hasn't fired yet runs now. Anything else armed is aborted.
+
+        Args:
+            name (str): Name of the action.
+            origin (float, optional): Same as submit()'s. Defaults to the time of submission.
+
+        Raises:
+            ValueError: If the action name is not recognized.
+
+        Returns:
+            bool: True if the action was queued, False if it already ran early, was coalesced or debounced.
+        """
+        if name not in self._actions:
+            raise ValueError("%s is not a recognized action" % name)
+        with self._cond:
+            if self._fired == name:
+                self._fired = None
+                self.actions_committed += 1
+                return False
+            if self._armed == name:
+                self._armed = None
+                self.actions_committed += 1
+                return self._enqueue(name, origin)
+        self.abort()
+        return self.submit(name, origin)
+
+    def _fire_armed(self):
+        """Moves the armed action into the queue. Must hold _cond."""
+        name, self._armed = self._armed, None
+        self._fired = name
+        self.actions_fired_early += 1
+        self._enqueue(name, self._armed_at)
+
+    def _next_task(self):
+        """Waits for something to do. Must hold _cond. Returns the name of an armed action to prepare, the names of actions to run, or None when closing."""
+        while self._running:
+            if self._ready:
+                if self._armed is not None and perf_counter() >= self._armed_at:
+                    self._fire_armed()
+                if len(self._pending) > 0:
+                    names = [self._pending.popleft()]
+                    # drain everything batchable up to the next action that has to run on its own, so order is kept
+                    while names[0] in self._batch_actions and len(self._pending) > 0 and self._pending[0] in self._batch_actions:
+                        names.append(self._pending.popleft())
+                    return names
+                if self._armed is not None and not self._armed_prepared:
+                    self._armed_prepared = True
+                    return self._armed
+            # wake up in time for the armed action
+            self._cond.wait(None if self._armed is None or not self._ready else max(self._armed_at - perf_counter(), 0))
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                names = self._next_task()
+                if names is None:
+                    break
+                if isinstance(names, list):
+                    origins = [self._origins.pop(name) for name in names]
+                    self.current_actions = names
+                    started = perf_counter()
+                    for name in names:
+                        self._last_run[name] = started
+            if isinstance(names, str):
+                # an armed action- get it ready while its gesture finishes
+                try:
+                    self._prepare(names)
+                except Exception as e:
+                    print("[ActionExecutor] Error: preparing action '%s' failed. " % names, end = "")
+                    print(e)
+                continue
+            try:
+                if names[0] in self._batch_actions:
+                    self._batch(names)
+                else:
+                    self._actions[names[0]]()
+            except Exception as e:
+                print("[ActionExecutor] Error: action '%s' failed. " % "', '".join(names), end = "")
+                print(e)
+            finally:
+                with self._cond:
+                    self.current_actions = []
+                    self.actions_run += len(names)
+                    if names[0] in self._batch_actions:
+                        self.batches_run += 1
+            if self._on_complete is not None:
+                finished = perf_counter()
+                for name, origin in zip(names, origins):
+                    self._on_complete(name, origin, started, finished)
+
+    def is_busy(self) -> bool:
+        with self._cond:
+            return len(self.current_actions) > 0 or len(self._pending) > 0
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.actions_submitted,
+            "coalesced": self.actions_coalesced,
+            "debounced": self.actions_debounced,
+            "run": self.actions_run,
+            "batches": self.batches_run,
+            "armed": self.actions_armed,
+            "fired_early": self.actions_fired_early,
+            "committed": self.actions_committed,
+            "aborted": self.actions_aborted,
+            "mispredicted": self.actions_mispredicted
+        }
+
+    def close(self, timeout: float = None):
+        with self._cond:
+            self._running = False
+            self._armed = None
+            self._pending.clear()
+            self._origins.clear()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<ActionExecutor>%s" % str(self.stats())
@@ -0,0 +1,316 @@
+# Module containing the browser backends YTDriver runs on
+from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+from webdriverlib.element_cache import ElementCache
+from abc import ABC, abstractmethod
+from time import perf_counter, sleep
+from typing import Any, Dict, Optional
+from urllib.request import urlopen
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import threading
+try:
+    import websocket # websocket-client, only needed by CDPBackend
+except ImportError:
+    websocket = None
+
+MOCK_PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock", "shorts.html")
+
+def mock_page_url() -> str:
+    """file:// URL of the local page that mimics the Shorts feed, for testing without YouTube. Pass it to YTDriver as url."""
+    return pathlib.Path(MOCK_PAGE_PATH).as_uri()
+
+class BrowserBackend(ABC):
+    """What YTDriver needs from a browser. Elements are registered by name with a CSS selector, and clicked by name,
+    so each backend is free to resolve and click them however is cheapest for it.
+    Scripts are function bodies that read their parameters from arguments and return a JSON-compatible value, same as selenium's execute_script.
+    """
+
+    @abstractmethod
+    def start(self, url: str, left_monitor: bool = True):
+        """Opens the browser (or attaches to one) and loads url."""
+        ...
+
+    @abstractmethod
+    def current_url(self) -> str:
+        ...
+
+    @abstractmethod
+    def execute_script(self, script: str, *args) -> Any:
+        ...
+
+    @abstractmethod
+    def register(self, name: str, selector: str, ttl_s: float = None, child: str = None):
+        """Adds an element that click() and wait_for() can find by name. child is a CSS selector for a clickable child to fall back to."""
+        ...
+
+    @abstractmethod
+    def wait_for(self, name: str, timeout_s: float) -> bool:
+        """Waits for an element to be on the page. Returns False if it never showed up."""
+        ...
+
+    @abstractmethod
+    def click(self, name: str) -> bool:
+        """Clicks an element. Returns False if it isn't on the page, raises if it is there but the click failed."""
+        ...
+
+    def prepare(self, name: str) -> bool:
+        """Looks an element up ahead of a click(), so the click doesn't have to. Returns False if it isn't on the page."""
+        return True
+
+    def invalidate(self, *names: str):
+        """Drops anything cached about the elements, e.g. after the page moved on to another short."""
+        ...
+
+    def process_alive(self) -> bool:
+        """Checks the browser process without talking to it."""
+        return True
+
+    @abstractmethod
+    def quit(self):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+class WebDriverBackend(BrowserBackend):
+    """Edge over the classic WebDriver HTTP protocol. Every call is a request to msedgedriver, so element handles are cached in an ElementCache.
+
+    Args:
+        user_data_dir (str, optional): Profile directory to reuse between runs, so sign-ins and the disk cache survive. Edge refuses a directory another Edge window already has open. Defaults to a fresh profile.
+    """
+
+    def __init__(self, user_data_dir: str = None):
+        self.user_data_dir = user_data_dir
+        self.driver = None
+        self.elements = None
+        self._selectors: Dict[str, str] = dict()
+
+    def start(self, url: str, left_monitor: bool = True):
+        options = webdriver.EdgeOptions()
+        options.add_experimental_option("excludeSwitches", ['enable-logging'])
+        options.add_argument("--log-level=3")
+        if self.user_data_dir is not None:
+            options.add_argument("--user-data-dir=%s" % os.path.abspath(self.user_data_dir))
+        self.driver = webdriver.Edge(options=options)
+        self.elements = ElementCache(self.driver)
+        if left_monitor:
+            self.driver.set_window_position(-2000, 1) # move it onto the left monitor- i.e. as far left as possible lmao
+        self.driver.maximize_window()
+        self.driver.get(url)
+
+    def current_url(self) -> str:
+        return self.driver.current_url
+
+    def execute_script(self, script: str, *args) -> Any:
+        return self.driver.execute_script(script, *args)
+
+    def register(self, name: str, selector: str, ttl_s: float = None, child: str = None):
+        self._selectors[name] = selector
+        self.elements.register(name, By.CSS_SELECTOR, selector, ttl_s, child)
+
+    def wait_for(self, name: str, timeout_s: float) -> bool:
+        try:
+            self.elements.put(name, WebDriverWait(self.driver, timeout_s).until(EC.presence_of_element_located((By.CSS_SELECTOR, self._selectors[name]))))
+            return True
+        except Exception:
+            return False
+
+    def click(self, name: str) -> bool:
+        return self.elements.click(name)
+
+    def prepare(self, name: str) -> bool:
+        return self.elements.get(name) is not None
+
+    def invalidate(self, *names: str):
+        self.elements.invalidate(*names)
+
+    def process_alive(self) -> bool:
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        return process is None or process.poll() is None
+
+    def quit(self):
+        if self.driver is not None:
+            self.driver.quit()
+
+    def stats(self) -> dict:
+        return {} if self.elements is None else self.elements.stats()
+
+class CDPBackend(BrowserBackend):
+    """Edge driven over one persistent Chrome DevTools Protocol websocket, with no driver process in between.
+    Clicks are real input events dispatched at the element's position, and a call costs one websocket message instead of an HTTP request.
+    If a browser is already listening on the debugging port it gets reused, which skips the browser's cold start entirely, and quit() leaves it open.
+
+    Args:
+        user_data_dir (str, optional): Profile directory to reuse between runs. Defaults to a "doomscroll" profile in the user's home directory.
+        port (int, optional): Remote debugging port. Defaults to 9222.
+        browser_path (str, optional): Browser executable. Defaults to the usual Edge install location.
+        startup_timeout_s (float, optional): How long to wait for the debugging port to come up. Defaults to 15.
+
+    Raises:
+        ImportError: If websocket-client is not installed.
+    """
+    # resolves an element (or its child) and returns where to click it. elements that aren't on screen get a script click instead,
+    # since scrolling them into view would move the feed to another short
+    _LOCATE_SCRIPT = """
+        var el = document.querySelector(arguments[0]);
+        if (!el) return null;
+        if (arguments[1]) el = el.querySelector(arguments[1]) || el;
+        var r = el.getBoundingClientRect(), x = r.left + r.width / 2, y = r.top + r.height / 2;
+        if (r.width === 0 || r.height === 0 || x < 0 || y < 0 || x >= innerWidth || y >= innerHeight) {
+            el.click();
+            return {rect: null};
+        }
+        return {rect: [x, y]};
+    """
+
+    def __init__(self, user_data_dir: str = None, port: int = 9222, browser_path: str = None, startup_timeout_s: float = 15):
+        if websocket is None:
+            raise ImportError("CDPBackend needs websocket-client (pip install websocket-client)")
+        self.user_data_dir = os.path.join(os.path.expanduser("~"), ".doomscroll", "edge") if user_data_dir is None else user_data_dir
+        self.port = port
+        self.browser_path = browser_path
+        self.startup_timeout_s = startup_timeout_s
+        self._process = None
+        self._socket = None
+        self._lock = threading.Lock() # one request on the socket at a time
+        self._next_id = 0
+        self._selectors: Dict[str, tuple] = dict() # name -> (selector, child)
+        self.calls = 0
+
+    def _find_browser(self) -> str:
+        if self.browser_path is not None:
+            return self.browser_path
+        candidates = [
+            os.path.join(os.environ.get("PROGRAMFILES(X86)", r"C:\Program Files (x86)"), "Microsoft", "Edge", "Application", "msedge.exe"),
+            os.path.join(os.environ.get("PROGRAMFILES", r"C:\Program Files"), "Microsoft", "Edge", "Application", "msedge.exe"),
+            "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge"
+        ] if sys.platform in ("win32", "darwin") else []
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        for name in ("msedge", "microsoft-edge", "microsoft-edge-stable"):
+            found = shutil.which(name)
+            if found is not None:
+                return found
+        raise FileNotFoundError("Could not find Edge- pass browser_path to CDPBackend")
+
+    def _http(self, path: str):
+        with urlopen("http://127.0.0.1:%d%s" % (self.port, path), timeout = 1) as response:
+            return json.loads(response.read().decode())
+
+    def _page_target(self) -> Optional[dict]:
+        try:
+            pages = [target for target in self._http("/json/list") if target.get("type") == "page"]
+        except Exception:
+            return None # nothing listening yet
+        return pages[0] if len(pages) > 0 else None
+
+    def start(self, url: str, left_monitor: bool = True):
+        target = self._page_target()
+        if target is None:
+            # no browser on the port- launch one. the url goes on the command line so it starts loading with the browser
+            arguments = [
+                self._find_browser(),
+                "--remote-debugging-port=%d" % self.port,
+                "--user-data-dir=%s" % os.path.abspath(self.user_data_dir),
+                "--no-first-run",
+                "--no-default-browser-check",
+                "--start-maximized"
+            ]
+            if left_monitor:
+                arguments.append("--window-position=-2000,1")
+            self._process = subprocess.Popen(arguments + [url], stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+            deadline = perf_counter() + self.startup_timeout_s
+            while target is None and perf_counter() < deadline:
+                sleep(0.05)
+                target = self._page_target()
+            if target is None:
+                raise TimeoutError("Browser did not open its debugging port within %ds" % self.startup_timeout_s)
+            self._connect(target)
+        else:
+            self._connect(target)
+            self._call("Page.navigate", {"url": url})
+
+    def _connect(self, target: dict):
+        # suppress_origin- newer browsers reject websocket clients that send an Origin header without --remote-allow-origins
+        self._socket = websocket.create_connection(target["webSocketDebuggerUrl"], suppress_origin = True)
+
+    def _call(self, method: str, params: dict = None) -> dict:
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._socket.send(json.dumps({"id": request_id, "method": method, "params": params or {}}))
+            self.calls += 1
+            while True:
+                message = json.loads(self._socket.recv())
+                if message.get("id") != request_id:
+                    continue # an event, or a reply nobody waited for
+                if "error" in message:
+                    raise RuntimeError("%s failed: %s" % (method, message["error"].get("message")))
+                return message.get("result", {})
+
+    def current_url(self) -> str:
+        return self.execute_script("return location.href;")
+
+    def execute_script(self, script: str, *args) -> Any:
+        result = self._call("Runtime.evaluate", {
+            "expression": "(function () {%s\n}).apply(null, %s)" % (script, json.dumps(list(args))),
+            "returnByValue": True
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise RuntimeError(details.get("exception", {}).get("description", details.get("text")))
+        return result.get("result", {}).get("value")
+
+    def register(self, name: str, selector: str, ttl_s: float = None, child: str = None):
+        self._selectors[name] = (selector, child)
+
+    def wait_for(self, name: str, timeout_s: float) -> bool:
+        deadline = perf_counter() + timeout_s
+        while True:
+            if self.execute_script("return document.querySelector(arguments[0]) !== null;", self._selectors[name][0]):
+                return True
+            if perf_counter() >= deadline:
+                return False
+            sleep(0.1)
+
+    def click(self, name: str) -> bool:
+        selector, child = self._selectors[name]
+        located = self.execute_script(self._LOCATE_SCRIPT, selector, child)
+        if located is None:
+            return False
+        if located["rect"] is not None:
+            x, y = located["rect"]
+            for event in ("mousePressed", "mouseReleased"):
+                self._call("Input.dispatchMouseEvent", {"type": event, "x": x, "y": y, "button": "left", "clickCount": 1})
+        return True
+
+    def process_alive(self) -> bool:
+        if self._socket is None or not self._socket.connected:
+            return False
+        return self._process is None or self._process.poll() is None
+
+    def quit(self):
+        if self._socket is not None:
+            # only close a browser we launched- one we attached to on the port is the user's own
+            if self._process is not None:
+                try:
+                    self._call("Browser.close")
+                except Exception:
+                    ... # already gone
+            self._socket.close()
+        if self._process is not None:
+            try:
+                self._process.wait(timeout = 5)
+            except subprocess.TimeoutExpired:
+                self._process.terminate()
+
+    def stats(self) -> dict:
+        return {"calls": self.calls}
@@ -0,0 +1,145 @@
+# Module containing the cache for WebDriver element handles
+from selenium.common.exceptions import StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException
+from selenium.webdriver.common.by import By
+from time import perf_counter
+from typing import Dict, NamedTuple, Optional
+
+class Locator(NamedTuple):
+    by: str
+    value: str
+    ttl_s: float
+    child: Optional[str] # css selector for a clickable child, used when the element itself can't be clicked
+
+class ElementCache(object):
+    """Keeps WebDriver element handles around between actions, so a click is a single round trip while the handle is fresh.
+    Handles are re-resolved once their locator's TTL runs out, or right away when a click raises StaleElementReferenceException.
+    When an element can't be clicked (not interactable, or another element is on top of it) the click falls back to its clickable child,
+    and from then on the child is resolved directly, so a cache miss costs one lookup plus the click.
+
+    Args:
+        driver (selenium.webdriver.Remote): Driver to resolve elements with.
+        default_ttl_s (float, optional): TTL for locators registered without one. Defaults to 5.
+
+    Returns:
+        ElementCache object. Register locators with register() before calling get() or click().
+    """
+    # locator strategies that can be written as a css selector, so a parent and its child resolve in one lookup
+    _CSS = {
+        By.ID: lambda value: "#%s" % value,
+        By.CSS_SELECTOR: lambda value: value,
+        By.TAG_NAME: lambda value: value
+    }
+
+    def __init__(self, driver, default_ttl_s: float = 5):
+        self._driver = driver
+        self.default_ttl_s = default_ttl_s
+        self._locators: Dict[str, Locator] = dict()
+        self._elements = dict() # name -> (WebElement, perf_counter time it was resolved)
+        self._use_child = set() # names whose element had to be clicked through its child
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.fallbacks = 0
+
+    def register(self, name: str, by: str, value: str, ttl_s: float = None, child: str = None):
+        """Adds a locator.
+
+        Args:
+            name (str): Name the element is looked up by.
+            by (str): selenium By strategy.
+            value (str): Locator value.
+            ttl_s (float, optional): Seconds a resolved handle is trusted for. Defaults to default_ttl_s.
+            child (str, optional): CSS selector of a clickable child to fall back to. Defaults to None.
+        """
+        self._locators[name] = Locator(by, value, self.default_ttl_s if ttl_s is None else ttl_s, child)
+        self._elements.pop(name, None)
+
+    def put(self, name: str, element):
+        """Seeds the cache with an element that was already resolved, e.g. by a WebDriverWait."""
+        self._elements[name] = (element, perf_counter())
+
+    def invalidate(self, *names: str):
+        """Forgets the handles for names, or for every locator when no names are given."""
+        if len(names) == 0:
+            self._elements.clear()
+        for name in names:
+            self._elements.pop(name, None)
+
+    def _resolve(self, name: str):
+        locator = self._locators[name]
+        if name in self._use_child:
+            if locator.by in self._CSS:
+                found = self._driver.find_elements(By.CSS_SELECTOR, "%s %s" % (self._CSS[locator.by](locator.value), locator.child))
+            else:
+                parents = self._driver.find_elements(locator.by, locator.value)
+                found = parents[0].find_elements(By.CSS_SELECTOR, locator.child) if len(parents) > 0 else []
+        else:
+            # find_elements instead of find_element- a missing element is an empty list, not an exception
+            found = self._driver.find_elements(locator.by, locator.value)
+        return found[0] if len(found) > 0 else None
+
+    def get(self, name: str):
+        """Returns the cached handle for name while it is fresh, otherwise looks it up again. None if it isn't on the page.
+
+        Raises:
+            KeyError: If no locator is registered under name.
+        """
+        locator = self._locators[name]
+        cached = self._elements.get(name)
+        if cached is not None and perf_counter() - cached[1] < locator.ttl_s:
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        element = self._resolve(name)
+        if element is None:
+            self._elements.pop(name, None)
+        else:
+            self.put(name, element)
+        return element
+
+    def click(self, name: str) -> bool:
+        """Clicks the element registered under name, recovering from stale handles and unclickable parents.
+
+        Raises:
+            WebDriverException: If the click still fails after recovering.
+
+        Returns:
+            bool: True if something was clicked, False if the element isn't on the page.
+        """
+        for attempt in range(2):
+            element = self.get(name)
+            if element is None:
+                return False
+            try:
+                element.click()
+                return True
+            except StaleElementReferenceException:
+                # the page re-rendered under us- look it up again and retry once
+                self.stale += 1
+                self.invalidate(name)
+                if attempt > 0:
+                    raise
+            except (ElementNotInteractableException, ElementClickInterceptedException):
+                locator = self._locators[name]
+                if locator.child is None or name in self._use_child:
+                    raise
+                children = element.find_elements(By.CSS_SELECTOR, locator.child)
+                if len(children) == 0:
+                    raise
+                self.fallbacks += 1
+                self._use_child.add(name)
+                self.put(name, children[0])
+                children[0].click()
+                return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "fallbacks": self.fallbacks
+        }
+
+    def __repr__(self):
+        return "<ElementCache>%s" % str(self.stats())
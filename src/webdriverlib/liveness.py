@@ -0,0 +1,69 @@
+# Module containing the background liveness check for browser drivers
+import threading
+from time import perf_counter
+
+class LivenessMonitor(object):
+    """Watches a YTDriver on its own thread and publishes whether it is still alive as a plain flag, so hot loops never pay for a WebDriver request.
+    The driver process is polled often since that is free, and the browser itself is asked (one current_url round trip) every interval_s.
+
+    Args:
+        driver (YTDriver): Driver to watch. Anything with is_running() works, process_alive() and closed are used when present.
+        interval_s (float, optional): Time between WebDriver checks. Defaults to 1.
+        poll_s (float, optional): Time between driver process checks. Defaults to 0.1.
+
+    Returns:
+        LivenessMonitor object. Call start() to begin watching.
+    """
+
+    def __init__(self, driver, interval_s: float = 1, poll_s: float = 0.1):
+        self._driver = driver
+        self.interval_s = interval_s
+        self.poll_s = poll_s
+        self._alive = True
+        self._stop = threading.Event()
+        self._thread = None
+        self.checks = 0
+        self.died_at = None # perf_counter time the driver was found dead
+
+    @property
+    def alive(self) -> bool:
+        """Plain attribute reads only- safe to call every frame."""
+        return self._alive and not getattr(self._driver, "closed", False)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._loop, name = "LivenessMonitor", daemon = True)
+            self._thread.start()
+        return self
+
+    def _check_process(self) -> bool:
+        process_alive = getattr(self._driver, "process_alive", None)
+        return process_alive is None or process_alive()
+
+    def _loop(self):
+        next_check = perf_counter() + self.interval_s
+        while not self._stop.wait(self.poll_s):
+            alive = self._check_process()
+            if alive and perf_counter() >= next_check:
+                self.checks += 1
+                alive = self._driver.is_running()
+                next_check = perf_counter() + self.interval_s
+            if not alive:
+                self._alive = False
+                self.died_at = perf_counter()
+                break
+
+    def stats(self) -> dict:
+        return {
+            "alive": self.alive,
+            "checks": self.checks
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout = 1)
+        self._thread = None
+
+    def __repr__(self):
+        return "<LivenessMonitor>%s" % str(self.stats())
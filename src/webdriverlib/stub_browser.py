@@ -0,0 +1,85 @@
+# Module containing a stand-in for YTDriver that never opens a browser
+from time import perf_counter, sleep
+import threading
+
+class StubYTDriver:
+    """Same action methods as YTDriver, but only records when each one was called.
+    Used to benchmark the recognition pipeline offline.
+
+    Args:
+        action_ms (int, optional): Simulated time each action takes, standing in for the WebDriver click. Defaults to 0.
+        action_delay_ms (int, optional): Same as YTDriver's delay after each action. Defaults to 0.
+    """
+
+    TARGET_URL = "https://www.youtube.com/shorts"
+    BATCH_ACTIONS = ("next", "prev", "like", "dislike", "pause")
+
+    def __init__(self, action_ms: int = 0, action_delay_ms: int = 0):
+        self.action_ms = action_ms
+        self.action_delay = action_delay_ms
+        self.calls = [] # (action name, perf_counter time the action finished)
+        self.prepared = [] # (action name, perf_counter time it was prepared)
+        self._action_lock = threading.Lock()
+        self._running = True
+
+    @property
+    def running_action(self) -> bool:
+        return self._action_lock.locked()
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def process_alive(self) -> bool:
+        return self._running
+
+    def on_page(self, url_prefix: str) -> bool:
+        return self.TARGET_URL.startswith(url_prefix)
+
+    def on_target_page(self, max_age_s: float = None) -> bool:
+        return self._running
+
+    def _action(self, name: str):
+        with self._action_lock:
+            sleep(self.action_ms / 1000)
+            self.calls.append((name, perf_counter()))
+            sleep(self.action_delay / 1000)
+
+    def next_video(self):
+        self._action("next")
+
+    def prev_video(self):
+        self._action("prev")
+
+    def toggle_pause(self):
+        self._action("pause")
+
+    def toggle_like(self):
+        self._action("like")
+
+    def toggle_dislike(self):
+        self._action("dislike")
+
+    def prepare_action(self, name: str) -> bool:
+        self.prepared.append((name, perf_counter()))
+        return name in self.BATCH_ACTIONS
+
+    def run_actions(self, names: list) -> list:
+        """Same as YTDriver.run_actions- action_ms and action_delay_ms are paid once for the whole batch."""
+        if not self._running:
+            return []
+        with self._action_lock:
+            sleep(self.action_ms / 1000)
+            finished = perf_counter()
+            self.calls.extend((name, finished) for name in names)
+            sleep(self.action_delay / 1000)
+        return [True] * len(names)
+
+    def close(self):
+        self._action("quit")
+        self._running = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
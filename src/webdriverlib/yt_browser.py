@@ -1,8 +1,7 @@
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from time import sleep
+from webdriverlib.browser_backend import BrowserBackend, WebDriverBackend
+from time import perf_counter, sleep
+import threading
+from typing import Callable, Dict, List
 
 class YTDriver:
 
@@ -11,27 +10,139 @@ class YTDriver:
     LIKE_BUTTON_ID = "like-button"
     DISLIKE_BUTTON_ID = "dislike-button"
     TARGET_URL = "https://www.youtube.com/shorts"
+    # how long element handles are trusted before looking them up again. the navigation buttons stick around,
+    # the like/dislike buttons and the player belong to the current short and get re-rendered when it changes
+    NAVIGATION_TTL_S = 30
+    SHORT_TTL_S = 5
+    # how long a fetched URL is trusted for the page check before each action. the LivenessMonitor refreshes it every second,
+    # so actions usually skip the current_url round trip
+    URL_MAX_AGE_S = 2
+    # installs window.__doomscroll once per page load. prefixed to every script that needs it, since scripts don't share scope
+    #   warm(k): renders the k shorts after the current one and lets their thumbnails and video load ahead of time
+    #   watch(k): times the next navigation until the new short paints its first frame into ttff, then warms the ones after it
+    _PAGE_SCRIPT = """
+        var ds = window.__doomscroll;
+        if (!ds) {
+            ds = window.__doomscroll = {ttff: [], token: 0};
+            ds.active = function () { return document.querySelector("ytd-reel-video-renderer[is-active]"); };
+            ds.video = function () {
+                var active = ds.active();
+                return (active && active.querySelector("video")) || document.querySelector("video");
+            };
+            ds.warm = function (k) {
+                var renderers = Array.prototype.slice.call(document.querySelectorAll("ytd-reel-video-renderer"));
+                var index = renderers.indexOf(ds.active());
+                renderers.slice(index + 1, index + 1 + k).forEach(function (renderer) {
+                    renderer.style.contentVisibility = "visible";
+                    renderer.querySelectorAll("img[loading=lazy]").forEach(function (img) { img.loading = "eager"; });
+                    renderer.querySelectorAll("video").forEach(function (video) { video.preload = "auto"; });
+                });
+            };
+            ds.watch = function (k) {
+                var token = ++ds.token, start = performance.now(), active = ds.active(), video = ds.video();
+                var src = video && video.currentSrc;
+                function painted() {
+                    if (token !== ds.token) return; // another navigation took over
+                    ds.ttff.push(performance.now() - start);
+                    if (k > 0) ds.warm(k);
+                }
+                function poll() {
+                    if (token !== ds.token || performance.now() - start > 5000) return;
+                    var current = ds.video();
+                    if (current && (ds.active() !== active || current.currentSrc !== src)) {
+                        if (current.requestVideoFrameCallback) current.requestVideoFrameCallback(painted);
+                        else current.addEventListener("playing", painted, {once: true});
+                        return;
+                    }
+                    setTimeout(poll, 10);
+                }
+                poll();
+            };
+        }
+    """
+    # actions run_actions() can do in one execute_script call
+    BATCH_ACTIONS = ("next", "prev", "like", "dislike", "pause")
+    # registered element each action clicks, for prepare_action(). next and prev find their button in _NAVIGATE_SCRIPT instead
+    _ACTION_ELEMENTS = {"like": "like", "dislike": "dislike", "pause": "video"}
+    _BATCH_SCRIPT = _PAGE_SCRIPT + """
+        var target = arguments[0], names = arguments[1], selectors = arguments[2], prefetch = arguments[3];
+        if (location.href.indexOf(target) !== 0) return null;
+        function find(selector) {
+            // prefer the short that is on screen, the feed keeps its neighbours rendered too
+            return document.querySelector("ytd-reel-video-renderer[is-active] " + selector) || document.querySelector(selector);
+        }
+        function press(name) {
+            var el = find(selectors[name]);
+            if (!el) return false;
+            (el.querySelector("button") || el).click();
+            if (name === "next" || name === "prev") ds.watch(prefetch);
+            return true;
+        }
+        function pause() {
+            var video = find(selectors.pause);
+            if (!video) return false;
+            if (video.paused) video.play(); else video.pause();
+            return true;
+        }
+        var results = names.map(function (name) { return name === "pause" ? pause() : press(name); });
+        return {results: results, first_frames: ds.ttff.splice(0)};
+    """
+    _BATCH_SELECTORS = {
+        "next": "#" + DOWN_BUTTON_ID,
+        "prev": "#" + UP_BUTTON_ID,
+        "like": "#" + LIKE_BUTTON_ID,
+        "dislike": "#" + DISLIKE_BUTTON_ID,
+        "pause": "video"
+    }
+    # next_video() and prev_video() without run_actions(). the watch starts in the same call as the click,
+    # so the timer doesn't wait on a second round trip and can't miss a navigation that has already landed
+    _NAVIGATE_SCRIPT = _PAGE_SCRIPT + """
+        var el = document.querySelector(arguments[0]);
+        if (!el) return {clicked: false, first_frames: ds.ttff.splice(0)};
+        ds.watch(arguments[1]);
+        (el.querySelector("button") || el).click();
+        return {clicked: true, first_frames: ds.ttff.splice(0)};
+    """
+    _WARM_SCRIPT = _PAGE_SCRIPT + """
+        ds.warm(arguments[0]);
+    """
 
-    def __init__(self, action_delay_ms: int = 650, left_monitor = True):
+    def __init__(self, action_delay_ms: int = 650, left_monitor = True, prefetch: int = 0, on_first_frame: Callable[[float], None] = None, backend: BrowserBackend = None, url: str = None):
+        """
+        Args:
+            action_delay_ms (int, optional): Time to wait after each action for YouTube to catch up. Defaults to 650.
+            left_monitor (bool, optional): Open the window on the left monitor. Defaults to True.
+            prefetch (int, optional): Number of upcoming shorts to keep rendered and loading ahead of time. Defaults to 0.
+            on_first_frame (Callable[[float], None], optional): Called with the milliseconds from each navigation to the new short's first painted frame.
+                Measurements are collected on the next script call, so they arrive one action late. Defaults to None.
+            backend (BrowserBackend, optional): Browser to drive, e.g. a CDPBackend. Defaults to a WebDriverBackend with a fresh profile.
+            url (str, optional): Page to open and stay on, e.g. mock_page_url() for testing. Defaults to TARGET_URL.
+        """
         self.action_delay = action_delay_ms
-        self.running_action = False
-
-        options = webdriver.EdgeOptions()
-        options.add_experimental_option("excludeSwitches", ['enable-logging'])
-        options.add_argument("--log-level=3")
-        self.driver = webdriver.Edge(options=options)
-        if left_monitor:
-            self.driver.set_window_position(-2000, 1) # move it onto the left monitor- i.e. as far left as possible lmao
-        self.driver.maximize_window()
-        self.driver.get(self.TARGET_URL)
-        wait = WebDriverWait(self.driver, 5)
+        self.prefetch = prefetch
+        self.target_url = self.TARGET_URL if url is None else url
+        self._on_first_frame = on_first_frame
+        self.last_first_frame_ms = None
+        self._last_url = None # (url, perf_counter time it was fetched)
+        self.closed = False
+        self._action_lock = threading.Lock() # held for the whole click + action delay
+
+        self.backend = WebDriverBackend() if backend is None else backend
         try:
-            self._down_button = wait.until(EC.presence_of_element_located((By.ID, self.DOWN_BUTTON_ID)))
-            self._like_button = wait.until(EC.presence_of_element_located((By.ID, self.LIKE_BUTTON_ID)))
-            self._dislike_button = wait.until(EC.presence_of_element_located((By.ID, self.DISLIKE_BUTTON_ID)))
-            self._video_player = wait.until(EC.presence_of_element_located((By.TAG_NAME, "video")))
+            self.backend.start(self.target_url, left_monitor)
+            self.backend.register("up", "#" + self.UP_BUTTON_ID, self.NAVIGATION_TTL_S)
+            self.backend.register("down", "#" + self.DOWN_BUTTON_ID, self.NAVIGATION_TTL_S)
+            self.backend.register("like", "#" + self.LIKE_BUTTON_ID, self.SHORT_TTL_S, child = "button")
+            self.backend.register("dislike", "#" + self.DISLIKE_BUTTON_ID, self.SHORT_TTL_S, child = "button")
+            self.backend.register("video", "video", self.SHORT_TTL_S)
+            for name in ("down", "like", "dislike", "video"):
+                if not self.backend.wait_for(name, 5):
+                    raise TimeoutError("%s never showed up on %s" % (name, self.target_url))
+            if self.prefetch > 0:
+                self.backend.execute_script(self._WARM_SCRIPT, self.prefetch)
         except Exception as e:
-            self.driver.quit()
+            self.closed = True
+            self.backend.quit()
             self._errprint("Failed to initalize webdriver. Trace:")
             print(e)
 
@@ -42,77 +153,184 @@ class YTDriver:
         except:
             return False
 
+    def process_alive(self) -> bool:
+        """Checks the browser (or driver) process without a request. Only catches the process exiting, not the window being closed."""
+        return self.backend.process_alive()
+
     def on_page(self, url_prefix: str) -> bool:
-        return self.driver.current_url.startswith(url_prefix)
+        url = self.backend.current_url()
+        self._last_url = (url, perf_counter())
+        return url.startswith(url_prefix)
 
-    def on_target_page(self) -> bool:
-        return self.on_page(self.TARGET_URL)
+    def on_target_page(self, max_age_s: float = None) -> bool:
+        """Checks the browser is on target_url. With max_age_s, a URL fetched at most that long ago (e.g. by is_running() on the LivenessMonitor's thread)
+        is reused instead of asking the browser again."""
+        last_url = self._last_url
+        if max_age_s is not None and last_url is not None and perf_counter() - last_url[1] <= max_age_s:
+            return last_url[0].startswith(self.target_url)
+        return self.on_page(self.target_url)
 
     def _errprint(self, content):
         print("[YTDriver] Error: ", end = "")
         print(content)
 
+    @property
+    def running_action(self) -> bool:
+        return self._action_lock.locked()
+
     def _finish_action(self):
-        self.running_action = False
         sleep(self.action_delay / 1000)
 
-    def next_video(self):
-        self.running_action = True
+    def _report_first_frames(self, first_frames: List[float]):
+        for ms in first_frames or []:
+            self.last_first_frame_ms = ms
+            if self._on_first_frame is not None:
+                self._on_first_frame(ms)
+
+    def _click(self, name: str, description: str, required: bool = True) -> bool:
+        """Clicks a cached element, then waits out the action delay if anything was clicked. Must hold the action lock."""
         try:
-            self._down_button.click()
+            if not self.backend.click(name):
+                if required:
+                    self._errprint("Could not find %s" % description)
+                return False
         except:
-            self._errprint("Failed to click %s" % self.DOWN_BUTTON_ID)
-        finally:
-             self._finish_action()
+            self._errprint("Failed to click %s" % description)
+        self._finish_action()
+        return True
+
+    def _navigate(self, button_id: str, required: bool = True) -> bool:
+        """Clicks a navigation button and starts timing the navigation in one script call, warming up the shorts after it once it lands.
+        Waits out the action delay if anything was clicked. Must hold the action lock."""
+        try:
+            response = self.backend.execute_script(self._NAVIGATE_SCRIPT, "#" + button_id, self.prefetch)
+            self._report_first_frames(response["first_frames"])
+            if not response["clicked"]:
+                if required:
+                    self._errprint("Could not find %s" % button_id)
+                return False
+            self.backend.invalidate("like", "dislike", "video") # they belong to the short we just left
+        except:
+            self._errprint("Failed to click %s" % button_id)
+        self._finish_action()
+        return True
+
+    def next_video(self):
+        with self._action_lock:
+            self._navigate(self.DOWN_BUTTON_ID)
 
     def prev_video(self):
-        if self.driver.find_elements(By.ID, self.UP_BUTTON_ID):
-            self.running_action = True
-            self._up_button = self.driver.find_element(By.ID, self.UP_BUTTON_ID)
-            try:
-                self._up_button.click()
-            except:
-                self._errprint("Failed to click %s" % self.UP_BUTTON_ID)
-            finally:
-                 self._finish_action()
-        else:
-            # button does not exist- likely at the top of the feed
-            ...
+        with self._action_lock:
+            # button does not exist at the top of the feed- nothing gets clicked
+            self._navigate(self.UP_BUTTON_ID, required = False)
     
     def toggle_pause(self):
-        self.running_action = True
-        try:
-            self._video_player.click()
-        except:
-            self._errprint("Failed to click video element")
-        finally:
-             self._finish_action()
+        with self._action_lock:
+            self._click("video", "video element")
     
     def toggle_like(self):
-        self.running_action = True
-        try:
-            self._like_button.click()
-        except:
-            self._errprint("Failed to click %s" % self.LIKE_BUTTON_ID)
-        finally:
-             self._finish_action()
+        with self._action_lock:
+            self._click("like", self.LIKE_BUTTON_ID)
 
     def toggle_dislike(self):
-        self.running_action = True
+        with self._action_lock:
+            self._click("dislike", self.DISLIKE_BUTTON_ID)
+
+    def prepare_action(self, name: str) -> bool:
+        """Looks up the element an action is going to click ahead of time, e.g. while the gesture that triggers it is still being held,
+        so running it is only the click. Doesn't wait for a running action.
+
+        Args:
+            name (str): Action name, same as driver_actions().
+
+        Returns:
+            bool: False if there is nothing to prepare for the action, or its element isn't on the page.
+        """
+        element = self._ACTION_ELEMENTS.get(name)
+        if element is None or self.closed:
+            return False
         try:
-            self._dislike_button.click()
-        except:
-            self._errprint("Failed to click %s" % self.DISLIKE_BUTTON_ID)
-        finally:
-             self._finish_action()
+            return self.backend.prepare(element)
+        except Exception as e:
+            self._errprint("Failed to prepare %s. " % name)
+            print(e)
+            return False
+
+    def run_actions(self, names: List[str]) -> List[bool]:
+        """Runs several actions in a single execute_script round trip- checking the page, finding the buttons and clicking them all happen in the browser.
+        The action delay is only waited out once for the whole batch.
+
+        Args:
+            names (List[str]): Actions from BATCH_ACTIONS, run in order.
+
+        Returns:
+            List[bool]: Whether each action found something to click. Empty if the browser is not on target_url.
+        """
+        selectors = self._BATCH_SELECTORS
+        with self._action_lock:
+            try:
+                response = self.backend.execute_script(self._BATCH_SCRIPT, self.target_url, list(names), selectors, self.prefetch)
+            except Exception as e:
+                self._errprint("Failed to run %s. " % ", ".join(names))
+                print(e)
+                self._finish_action()
+                return [False] * len(names)
+            if response is None:
+                return []
+            results = response["results"]
+            self._report_first_frames(response["first_frames"])
+            for name, clicked in zip(names, results):
+                # no up button at the top of the feed is expected
+                if not clicked and name != "prev":
+                    self._errprint("Could not find %s" % selectors[name])
+            if any(clicked and name in ("next", "prev") for name, clicked in zip(names, results)):
+                self.backend.invalidate("like", "dislike", "video")
+            if any(results):
+                self._finish_action()
+            return results
 
     def close(self):
-        self.running_action = True
-        self.driver.quit()
-        self.running_action = False
+        with self._action_lock:
+            self.closed = True
+            self.backend.quit()
 
     def __enter__(self):
         return self
     
     def __exit__(self):
         self.close()
+
+
+def driver_actions(get_driver: Callable[[], "YTDriver"]) -> Dict[str, Callable]:
+    """Default gesture actions for a YTDriver, to hand to an ActionExecutor.
+    The page check before each action reuses the URL the LivenessMonitor last fetched when it is recent enough, so an action is only the click.
+
+    Args:
+        get_driver (Callable[[], YTDriver]): Returns the driver to act on. Called every time an action runs, so the driver can be swapped in after startup.
+    """
+    return {
+        "next": lambda: get_driver().on_target_page(YTDriver.URL_MAX_AGE_S) and get_driver().next_video(),
+        "prev": lambda: get_driver().on_target_page(YTDriver.URL_MAX_AGE_S) and get_driver().prev_video(),
+        "like": lambda: get_driver().on_target_page(YTDriver.URL_MAX_AGE_S) and get_driver().toggle_like(),
+        "dislike": lambda: get_driver().on_target_page(YTDriver.URL_MAX_AGE_S) and get_driver().toggle_dislike(),
+        "pause": lambda: get_driver().on_target_page(YTDriver.URL_MAX_AGE_S) and get_driver().toggle_pause(),
+        "quit": lambda: get_driver().close()
+    }
+
+def driver_batch(get_driver: Callable[[], "YTDriver"]) -> Callable[[List[str]], List[bool]]:
+    """Batch runner for a YTDriver, to hand to an ActionExecutor along with YTDriver.BATCH_ACTIONS.
+    Every gesture becomes one execute_script call, including the target page check, instead of a round trip per step.
+
+    Args:
+        get_driver (Callable[[], YTDriver]): Returns the driver to act on. Called every time a batch runs.
+    """
+    return lambda names: get_driver().run_actions(names)
+
+def driver_prepare(get_driver: Callable[[], "YTDriver"]) -> Callable[[str], bool]:
+    """Prepare hook for a YTDriver, to hand to an ActionExecutor so armed actions have their element looked up before they run.
+    Only useful without driver_batch- the batch script finds its elements in the page and never uses the looked up handles.
+
+    Args:
+        get_driver (Callable[[], YTDriver]): Returns the driver to act on. Called every time an action is prepared.
+    """
+    return lambda name: get_driver().prepare_action(name)
@@ -0,0 +1,85 @@
+# feeds synthetic recognizer results through GestureHandler and checks when each binding fires, without a camera, model or browser
+#   python tests/gesture_timing.py
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from mediapipelib.gesture_recognize import *
+from mediapipelib.gesture_match import GestureMatcher
+from mediapipelib.gesture_smoothing import GestureSmoother
+from mediapipelib.hand_identity import HandIdentityTracker
+from pipelinelib.gesture_handler import GestureHandler
+from pipelinelib.replay import result_from_dict
+
+FRAME_MS = 33
+BEFORE_MS = 500
+gestures = {
+    "next": GestureSequence(["Open_Palm", 750, EITHER_HAND]),
+    "prev": GestureSequence(["Pointing_Up", 600, RIGHT_HAND]),
+    "like": GestureSequence(["Thumb_Up", 900, EITHER_HAND]),
+    "dislike": GestureSequence(["Thumb_Down", 1200, EITHER_HAND])
+}
+
+class RecordingExecutor(object):
+    def __init__(self):
+        self.fired = [] # (action name, timestamp_ms of the frame it fired on)
+        self.timestamp_ms = 0
+
+    def submit(self, name: str, origin: float = None):
+        self.fired.append((name, self.timestamp_ms))
+
+def result(gesture: str = None, score: float = 0.9, both: bool = False):
+    """One right hand holding gesture, or with both a left hand on the other side of the frame holding it too"""
+    hands = [] if gesture is None else [("Right", 0.3), ("Left", 0.7)] if both else [("Right", 0.5)]
+    return result_from_dict({
+        "timestamp_ms": 0,
+        "gestures": [[[0, score, "", gesture]] for _ in hands],
+        "handedness": [[[0, 0.9, "", label]] for label, _ in hands],
+        "hand_landmarks": [[[x, 0.5, 0]] * 21 for _, x in hands]
+    })[0]
+
+def run(gesture: str, appear_ms: int, end_ms: int, smoothing: bool, hand_ids: bool, min_gesture_ms: int = 300, history_len: int = 2, before: str = None, both: bool = False, bindings: dict = gestures):
+    """Empty frames until appear_ms, then one hand (or both) holding gesture until end_ms. Returns what fired, relative to appear_ms.
+    With before, the hand shows up BEFORE_MS earlier holding that gesture instead."""
+    executor = RecordingExecutor()
+    handler = GestureHandler(
+        GestureTracker(min_gesture_ms, history_len, 5500),
+        GestureMatcher(bindings),
+        executor,
+        info_msgs = False,
+        smoother = GestureSmoother() if smoothing else None,
+        hands = HandIdentityTracker() if hand_ids else None
+    )
+    for timestamp_ms in range(0, end_ms, FRAME_MS):
+        executor.timestamp_ms = timestamp_ms
+        if timestamp_ms >= appear_ms:
+            shown = gesture
+        elif before is not None and timestamp_ms >= appear_ms - BEFORE_MS:
+            shown = before
+        else:
+            shown = None
+        handler(result(shown, both = both), None, timestamp_ms)
+    return [(name, ms - appear_ms) for name, ms in executor.fired]
+
+# (smoothing, hand_ids)
+CASES = [(False, True), (True, True), (False, False), (True, False)]
+
+failures = 0
+for smoothing, hand_ids in CASES:
+    for appear_ms, before in ((0, None), (1000, None), (3000, None), (1000, "Victory")):
+        for name, binding in gestures.items():
+            hold_ms = binding[0].duration
+            fired = run(binding[0].gesture, appear_ms, appear_ms + hold_ms + 500, smoothing, hand_ids, before = before)
+            # has to fire once, after the hold time, and no later than the smoother's lag and a couple of frames
+            ok = len(fired) == 1 and fired[0][0] == name and hold_ms <= fired[0][1] <= hold_ms + 250
+            failures += not ok
+            print("%-4s smoothing=%-5s hand_ids=%-5s appear=%4dms after=%-7s %-8s hold=%4dms fired=%s" % ("ok" if ok else "FAIL", smoothing, hand_ids, appear_ms, before, name, hold_ms, fired))
+
+# both hands holding a gesture only counts as the two-hand gesture, never as either hand on its own
+both_hands = dict(gestures, both = GestureSequence(["Open_Palm", 750, BOTH_HANDS]))
+for smoothing, hand_ids in CASES:
+    fired = run("Open_Palm", 1000, 1000 + 750 + 500, smoothing, hand_ids, both = True, bindings = both_hands)
+    ok = len(fired) == 1 and fired[0][0] == "both" and 750 <= fired[0][1] <= 750 + 250
+    failures += not ok
+    print("%-4s smoothing=%-5s hand_ids=%-5s both hands holding Open_Palm fired=%s" % ("ok" if ok else "FAIL", smoothing, hand_ids, fired))
+print("%d failures" % failures)
+sys.exit(failures > 0)
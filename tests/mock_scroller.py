@@ -0,0 +1,28 @@
+# drives YTDriver against the local mock shorts page and times each action, for comparing browser backends
+#   python tests/mock_scroller.py webdriver
+#   python tests/mock_scroller.py cdp
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from webdriverlib.yt_browser import YTDriver
+from webdriverlib.browser_backend import WebDriverBackend, CDPBackend, mock_page_url
+from time import perf_counter
+
+BACKEND = sys.argv[1] if len(sys.argv) > 1 else "webdriver"
+
+start = perf_counter()
+backend = CDPBackend(os.path.join(os.path.expanduser("~"), ".doomscroll", "mock")) if BACKEND == "cdp" else WebDriverBackend()
+driver = YTDriver(action_delay_ms = 0, left_monitor = False, prefetch = 2, backend = backend, url = mock_page_url())
+print("cold start: %dms" % ((perf_counter() - start) * 1000))
+
+for name, action in [("next", driver.next_video), ("like", driver.toggle_like), ("pause", driver.toggle_pause), ("pause", driver.toggle_pause), ("prev", driver.prev_video), ("next", driver.next_video)] * 3:
+    start = perf_counter()
+    action()
+    print("%-8s %6.1fms  (last first frame: %s)" % (name, (perf_counter() - start) * 1000, driver.last_first_frame_ms))
+
+start = perf_counter()
+driver.run_actions(["like", "pause", "next"])
+print("batch    %6.1fms" % ((perf_counter() - start) * 1000))
+print(driver.backend.execute_script("return mockLog.map(function (entry) { return entry.event + ' ' + entry.detail; });"))
+print(driver.backend.stats())
+driver.close()